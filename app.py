@@ -4,7 +4,6 @@ Main application file with blueprint registration and error handling
 """
 
 from flask import Flask, render_template, request
-from flask_session import Session
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 import os
 from dotenv import load_dotenv
@@ -14,18 +13,28 @@ load_dotenv()
 
 # Import database and blueprints
 from models import db
+from money import Money
 from blueprints import auth_bp, expenses_bp, income_bp, main_bp
+from migrations import ensure_schema, migrate_data_command
+from services import cache, index_advisor, n_plus_one, sessions, sql_timing, startup, storage, writes
+from services.importer import import_csv_command
+from services.rollups import rebuild_rollups_command
 
 def create_app():
     """Application factory function"""
     app = Flask(__name__)
     
     # Configuration
-    app.secret_key = os.getenv("SECRET_KEY", "dev-key-change-in-production")
+    secret_key = os.getenv("SECRET_KEY")
+    app.secret_key = secret_key or "dev-key-change-in-production"
     app.config["SESSION_PERMANENT"] = False
-    app.config["SESSION_TYPE"] = "filesystem"
-    app.config["SESSION_USE_SIGNER"] = True
     app.config["PERMANENT_SESSION_LIFETIME"] = 86400  # 24 hours
+    
+    # Session storage: cookie (signed, no server I/O), sqlalchemy or filesystem.
+    # Signed cookies are only the default with a real SECRET_KEY; a known key would let anyone forge a login.
+    default_backend = "cookie" if sessions.has_secure_secret_key(secret_key) else "sqlalchemy"
+    app.config["SESSION_BACKEND"] = os.getenv("SESSION_BACKEND", default_backend)
+    app.config["SESSION_PRUNE_EVERY"] = int(os.getenv("SESSION_PRUNE_EVERY", "1000"))  # requests per expired-session sweep, on average
     app.config["WTF_CSRF_TIME_LIMIT"] = None
     app.config["WTF_CSRF_CHECK_DEFAULT"] = False  # Disable by default, enable selectively
     
@@ -33,11 +42,66 @@ def create_app():
     database_url = os.getenv("DATABASE_URL", "sqlite:///database.db")
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SCHEMA_CHECK"] = os.getenv("SCHEMA_CHECK", "1") == "1"  # 0 skips even the schema version query
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = storage.engine_options(
+        database_url, threads=int(os.getenv("GUNICORN_THREADS", "1"))
+    )
+    
+    # SQLite pragmas applied to every connection: production (WAL, busy timeout, mmap) or default
+    app.config["SQLITE_PROFILE"] = os.getenv("SQLITE_PROFILE", "production")
+    app.config["SQLITE_PRAGMAS"] = storage.env_overrides()
+    # Log the effective settings at startup (`flask storage-info` shows them on demand)
+    app.config["STORAGE_STARTUP_REPORT"] = os.getenv("STORAGE_STARTUP_REPORT", "0") == "1"
+    
+    # Optional single-writer queue that groups concurrent writes into one commit
+    app.config["WRITE_COALESCING"] = os.getenv("WRITE_COALESCING", "0") == "1"
+    app.config["WRITE_MAX_BATCH"] = int(os.getenv("WRITE_MAX_BATCH", "64"))
+    app.config["WRITE_MAX_DELAY_MS"] = float(os.getenv("WRITE_MAX_DELAY_MS", "5"))
+    app.config["WRITE_TIMEOUT"] = float(os.getenv("WRITE_TIMEOUT", "10"))  # seconds a request waits for its write
+    
+    # Opt-in SQL timing: Server-Timing header per request plus a rotating slow-query log.
+    # The header names the slowest statements, so enable it for diagnosis rather than permanently.
+    app.config["SQL_TIMING"] = os.getenv("SQL_TIMING", "0") == "1"
+    app.config["SQL_TIMING_TOP_N"] = int(os.getenv("SQL_TIMING_TOP_N", "3"))  # slowest statements listed per request
+    app.config["SQL_SLOW_QUERY_MS"] = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+    app.config["SQL_SLOW_QUERY_LOG"] = os.getenv("SQL_SLOW_QUERY_LOG")  # default: instance/slow_queries.log
+    app.config["SQL_SLOW_QUERY_LOG_BYTES"] = int(os.getenv("SQL_SLOW_QUERY_LOG_BYTES", str(5 * 1024 * 1024)))
+    app.config["SQL_SLOW_QUERY_LOG_BACKUPS"] = int(os.getenv("SQL_SLOW_QUERY_LOG_BACKUPS", "3"))
+    
+    # N+1 detection: off, warn (log repeated statement shapes) or raise; warn raises under app.testing
+    app.config["N_PLUS_ONE"] = os.getenv("N_PLUS_ONE", "off")
+    app.config["N_PLUS_ONE_THRESHOLD"] = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # runs of one shape allowed per request
+    
+    # CSV import rows per transaction
+    app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+    # Largest CSV accepted through the web form; bigger files go through `flask import-csv`
+    app.config["IMPORT_MAX_UPLOAD_BYTES"] = int(os.getenv("IMPORT_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024)))
+    
+    # Background PDF reports
+    app.config["PDF_EXPORT_WORKERS"] = int(os.getenv("PDF_EXPORT_WORKERS", "1"))
+    app.config["PDF_REPORT_DIR"] = os.getenv("PDF_REPORT_DIR")
+    
+    # Default dashboard trend window in months (6, 12 or 24)
+    app.config["TREND_MONTHS"] = int(os.getenv("TREND_MONTHS", "6"))
+    
+    # Per-user read cache for dashboard, report and trend results (memory, sqlite or none)
+    app.config["READ_CACHE_BACKEND"] = os.getenv("READ_CACHE_BACKEND", "memory")
+    app.config["READ_CACHE_MAX_ENTRIES"] = int(os.getenv("READ_CACHE_MAX_ENTRIES", "1024"))
+    app.config["READ_CACHE_TTL"] = int(os.getenv("READ_CACHE_TTL", "300"))
+    app.config["READ_CACHE_PATH"] = os.getenv("READ_CACHE_PATH")
+    
+    # Mixed into page ETags so a deploy with new templates invalidates browser copies
+    app.config["ETAG_SALT"] = os.getenv("ETAG_SALT", os.getenv("RENDER_GIT_COMMIT", ""))
     
     # Initialize extensions
     db.init_app(app)
-    Session(app)
+    storage.init_app(app)
+    sql_timing.init_app(app)
+    n_plus_one.init_app(app)
+    sessions.init_app(app)
     CSRFProtect(app)
+    cache.init_app(app)
+    writes.init_app(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -45,14 +109,24 @@ def create_app():
     app.register_blueprint(income_bp, url_prefix="/income")
     app.register_blueprint(main_bp)
     
-    # Create database tables and app context
-    with app.app_context():
-        db.create_all()
+    # CLI commands
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(import_csv_command)
+    app.cli.add_command(migrate_data_command)
+    app.cli.add_command(sessions.prune_sessions_command)
+    app.cli.add_command(storage.storage_info_command)
+    app.cli.add_command(startup.startup_report_command)
+    app.cli.add_command(index_advisor.index_advisor_command)
+    
+    # Create tables and migrate data unless the database is already at the current schema version
+    if app.config["SCHEMA_CHECK"]:
+        with app.app_context():
+            ensure_schema(db.engine)
     
     # Custom filter for currency formatting
     @app.template_filter()
     def usd(value):
-        return f"${value:,.2f}"
+        return Money(value or 0).usd()
     
     app.jinja_env.globals.update(usd=usd)
     
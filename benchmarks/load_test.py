@@ -0,0 +1,289 @@
+"""
+End-to-end load test against gunicorn
+Seeds a SQLite file with synthetic users (benchmarks/seed.py), starts
+`gunicorn 'app:create_app()'` on it with the given worker count and class,
+logs every virtual user in, then has them replay a mix of page reads and
+single-row writes for a fixed duration. Reports p50/p95/p99 latency,
+throughput and error rates per operation and overall, including writes that
+failed with "database is locked".
+
+    python benchmarks/load_test.py [--workers 4] [--worker-class gthread --threads 4] [--users 32]
+                                   [--seconds 30] [--write-ratio 0.2] [--env WRITE_COALESCING=1] [--json]
+
+Each virtual user is a thread with its own HTTP session, so at high request
+rates the client itself can become the bottleneck; compare configurations at
+the same --users.
+"""
+
+import argparse
+import json
+import os
+import random
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import seed
+
+# (operation, weight) among reads, and among writes
+READS = [
+    ("/dashboard", 30),
+    ("/expenses/expense_history", 15),
+    ("/reports", 10),
+    ("/income/income_history", 5),
+    ("/budgets", 5),
+    ("/profile", 5),
+    ("/get_budget_suggestions", 5),
+]
+WRITES = [
+    ("add_expense", 3),
+    ("add_income", 1),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def session_reader(secret_key):
+    """Decode the app's signed session cookie, to read the flash a failed write left behind"""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    app = Flask(__name__)
+    app.secret_key = secret_key
+    serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+
+    def read(cookie):
+        try:
+            return serializer.loads(cookie)
+        except Exception:  # server-side sessions only carry an id
+            return {}
+    return read
+
+
+def start_server(args, env, log):
+    command = [
+        sys.executable, "-m", "gunicorn", "app:create_app()",
+        "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers),
+        "--worker-class", args.worker_class,
+        "--threads", str(args.threads),
+        "--timeout", "120",
+        "--graceful-timeout", "5",
+    ]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"gunicorn exited with {server.returncode}; see {log.name}")
+        try:
+            if requests.get(f"{args.base_url}/auth/login", timeout=5).status_code == 200:
+                return server
+        except requests.RequestException:  # not listening yet, or workers still booting
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f"gunicorn did not start within 60s; see {log.name}")
+
+
+def login(base_url, username):
+    client = requests.Session()
+    response = client.post(f"{base_url}/auth/login", data={"username": username, "password": seed.PASSWORD},
+                           allow_redirects=False)
+    if not response.headers.get("Location", "").endswith("/dashboard"):
+        raise SystemExit(f"Could not log in as {username}")
+    return client
+
+
+def write_request(client, base_url, operation, rng):
+    today = date.today().isoformat()
+    if operation == "add_expense":
+        data = {"amount[]": f"{rng.randint(100, 9999) / 100:.2f}", "category[]": rng.choice(seed.EXPENSE_CATEGORIES),
+                "date[]": today, "note[]": "load test"}
+        return client.post(f"{base_url}/expenses/add_expense", data=data, allow_redirects=False)
+    data = {"amount": f"{rng.randint(1000, 99999) / 100:.2f}", "date": today, "source": rng.choice(seed.INCOME_SOURCES)}
+    return client.post(f"{base_url}/income/add_income", data=data, allow_redirects=False)
+
+
+def classify(operation, response, read_session):
+    """None for success, otherwise the kind of error"""
+    if response.status_code >= 500:
+        return f"http_{response.status_code}"
+    if operation.startswith("/"):
+        return None if response.status_code == 200 else f"read_{response.status_code}"
+    if response.headers.get("Location", "").endswith("/dashboard"):
+        return None
+    flashes = read_session(response.cookies.get("session", "")).get("_flashes") or []
+    if flashes and "database is locked" in flashes[-1][1]:
+        return "database_locked"
+    return "write_rejected"
+
+
+def virtual_user(client, args, deadline, read_session, seed_value, records):
+    rng = random.Random(seed_value)
+    reads, read_weights = zip(*READS)
+    writes, write_weights = zip(*WRITES)
+    local = []
+    while time.time() < deadline:
+        if rng.random() < args.write_ratio:
+            operation = rng.choices(writes, write_weights)[0]
+        else:
+            operation = rng.choices(reads, read_weights)[0]
+        start = time.perf_counter()
+        try:
+            if operation.startswith("/"):
+                response = client.get(f"{args.base_url}{operation}", allow_redirects=False)
+            else:
+                response = write_request(client, args.base_url, operation, rng)
+            error = classify(operation, response, read_session)
+        except requests.RequestException as e:
+            error = type(e).__name__
+        local.append((operation, time.perf_counter() - start, error))
+    records.extend(local)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(records, seconds):
+    latencies = [latency * 1000 for _, latency, error in records if error is None]
+    errors = {}
+    for _, _, error in records:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    summary = {
+        "requests": len(records),
+        "throughput_rps": round(len(records) / seconds, 1),
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "errors": errors,
+    }
+    if latencies:
+        summary.update({
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_ms": round(statistics.mean(latencies), 2),
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker-class", default="sync", help="gunicorn worker class (sync, gthread, ...)")
+    parser.add_argument("--threads", type=int, default=1, help="Threads per worker (gthread)")
+    parser.add_argument("--users", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of operations that are writes")
+    parser.add_argument("--rows", type=int, default=2000, help="Expense rows per seeded user")
+    parser.add_argument("--db", default=None, help="Seeded SQLite file to reuse (needs --users bench users)")
+    parser.add_argument("--port", type=int, default=0, help="Port for gunicorn (default: any free one)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra app environment, e.g. WRITE_COALESCING=1 or SQLITE_PROFILE=default")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    args.port = args.port or free_port()
+    args.base_url = f"http://127.0.0.1:{args.port}"
+
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    fresh = args.db is None
+    args.db = args.db or os.path.join(workdir, "load.db")
+    secret_key = secrets.token_hex(16)
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.abspath(args.db)}",
+        SECRET_KEY=secret_key,
+        GUNICORN_THREADS=str(args.threads),
+        STORAGE_STARTUP_REPORT="0",
+        PDF_REPORT_DIR=os.path.join(workdir, "reports"),
+        **extra_env,
+    )
+
+    if fresh:
+        seed.configure(args.db)
+        os.environ.update(extra_env)
+        from app import create_app
+        seed.seed(create_app(), args.users, args.rows)
+
+    log_path = os.path.join(workdir, "gunicorn.log")
+    with open(log_path, "w") as log:
+        server = start_server(args, env, log)
+        clients = []
+        try:
+            clients.extend(login(args.base_url, f"bench{n}") for n in range(args.users))
+            read_session = session_reader(secret_key)
+            records = []
+            deadline = time.time() + args.seconds
+            threads = [
+                threading.Thread(target=virtual_user, args=(client, args, deadline, read_session, n, records))
+                for n, client in enumerate(clients)
+            ]
+            started = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.time() - started
+        finally:
+            # Open keep-alive connections would hold up a graceful shutdown
+            for client in clients:
+                client.close()
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    with open(log_path) as log:
+        locked_in_log = log.read().count("database is locked")
+
+    operations = [name for name, _ in READS + WRITES]
+    results = {
+        "config": {
+            "workers": args.workers, "worker_class": args.worker_class, "threads": args.threads,
+            "users": args.users, "seconds": args.seconds, "write_ratio": args.write_ratio, "env": extra_env,
+        },
+        "overall": summarize(records, elapsed),
+        "operations": {
+            name: summarize([record for record in records if record[0] == name], elapsed) for name in operations
+        },
+        "database_locked_in_server_log": locked_in_log,
+        "server_log": log_path,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    config = results["config"]
+    print(f"{config['workers']} x {config['worker_class']} worker(s), {config['threads']} thread(s), "
+          f"{config['users']} users, {args.seconds:.0f}s, {args.write_ratio:.0%} writes {extra_env or ''}")
+    for name, stats in [("overall", results["overall"])] + list(results["operations"].items()):
+        if not stats["requests"]:
+            continue
+        print(f"  {name:28} {stats['requests']:7d} req {stats['throughput_rps']:8.1f}/s  "
+              f"p50 {stats.get('p50_ms', 0):7.1f}  p95 {stats.get('p95_ms', 0):7.1f}  p99 {stats.get('p99_ms', 0):7.1f} ms  "
+              f"errors {stats['error_rate']:.2%} {stats['errors'] or ''}")
+    print(f"  'database is locked' in server log: {locked_in_log}")
+
+
+if __name__ == "__main__":
+    main()
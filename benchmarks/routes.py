@@ -0,0 +1,189 @@
+"""
+Route timings at realistic data sizes
+Times the main pages through the Flask test client as a seeded user and
+emits JSON with per-route latency percentiles, the commit and the data size,
+so runs can be compared across commits. /export_pdf is timed from the
+request until the background report is ready to download. The read cache
+is off unless --read-cache is given, so every request does its full work.
+
+    python benchmarks/routes.py --rows 10000 --output before.json
+    python benchmarks/routes.py --rows 10000 --compare before.json
+    python benchmarks/routes.py --db /tmp/bench.db   # reuse a database from seed.py
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import seed
+
+ROUTES = [
+    "/dashboard",
+    "/reports",
+    "/profile",
+    "/budgets",
+    "/expenses/expense_history",
+    "/expenses/expense_history?category=Food",
+    "/income/income_history",
+    "/get_budget_suggestions",
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples, statuses):
+    ms = [sample * 1000 for sample in samples]
+    return {
+        "requests": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+        "statuses": sorted(set(statuses)),
+    }
+
+
+def time_route(client, path, repeat, warmup):
+    for _ in range(warmup):
+        client.get(path)
+    samples, statuses = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+    return summarize(samples, statuses)
+
+
+def time_pdf_export(client, repeat, timeout=300):
+    """Time /export_pdf until its report downloads, polling the job page"""
+    samples, statuses = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get("/export_pdf")
+        location = response.headers.get("Location", "")
+        while "/export_pdf/" in location and time.perf_counter() - start < timeout:
+            response = client.get(location)
+            if response.status_code != 202:
+                break
+            time.sleep(0.01)
+        samples.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+    return summarize(samples, statuses)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    if args.db is None:
+        workdir = tempfile.mkdtemp(prefix="bench-routes-")
+        args.db = os.path.join(workdir, "bench.db")
+        fresh = True
+    else:
+        fresh = not os.path.exists(args.db)
+    seed.configure(args.db)
+    os.environ["READ_CACHE_BACKEND"] = "memory" if args.read_cache else "none"
+    os.environ["PDF_REPORT_DIR"] = os.path.join(os.path.dirname(os.path.abspath(args.db)), "reports")
+
+    from app import create_app
+    from models import db, Expense, Income, User
+
+    app = create_app()
+    if fresh:
+        seed.seed(app, 1, args.rows, months=args.months, verbose=True)
+
+    with app.app_context():
+        user = db.session.query(User).filter(User.username.like("bench%")).order_by(User.id).first()
+        if user is None:
+            raise SystemExit(f"No bench users in {args.db}; create them with benchmarks/seed.py")
+        data = {
+            "user": user.username,
+            "expense_rows": db.session.query(Expense).filter_by(user_id=user.id).count(),
+            "income_rows": db.session.query(Income).filter_by(user_id=user.id).count(),
+        }
+
+    client = app.test_client()
+    response = client.post("/auth/login", data={"username": user.username, "password": seed.PASSWORD})
+    if not response.headers.get("Location", "").endswith("/dashboard"):
+        raise SystemExit(f"Could not log in as {user.username}")
+
+    routes = {}
+    for path in ROUTES:
+        routes[path] = time_route(client, path, args.repeat, args.warmup)
+        print(f"{path:45} p50 {routes[path]['p50_ms']:9.2f} ms  p95 {routes[path]['p95_ms']:9.2f} ms"
+              f"{'' if routes[path]['statuses'] == [200] else '  statuses ' + str(routes[path]['statuses'])}",
+              file=sys.stderr)
+    if args.pdf_repeat:
+        routes["/export_pdf"] = time_pdf_export(client, args.pdf_repeat)
+        print(f"{'/export_pdf (until ready)':45} p50 {routes['/export_pdf']['p50_ms']:9.2f} ms", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "read_cache": args.read_cache,
+        "repeat": args.repeat,
+        "data": data,
+        "routes": routes,
+    }
+
+
+def compare(results, baseline):
+    """Print each route's p50 against a previous run's"""
+    print(f"p50 vs {baseline.get('commit')} ({baseline['data']['expense_rows']} expense rows):", file=sys.stderr)
+    for path, stats in results["routes"].items():
+        before = baseline["routes"].get(path)
+        if before is None:
+            continue
+        ratio = stats["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+        print(f"  {path:45} {before['p50_ms']:9.2f} -> {stats['p50_ms']:9.2f} ms  ({ratio:.2f}x)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=None, help="Seeded SQLite file (default: a fresh temporary one)")
+    parser.add_argument("--rows", type=int, default=1000, help="Expense rows when seeding a fresh database")
+    parser.add_argument("--months", type=int, default=24, help="History window when seeding")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per route")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per route first")
+    parser.add_argument("--pdf-repeat", type=int, default=3, help="PDF exports to time (0 skips them)")
+    parser.add_argument("--read-cache", action="store_true", help="Keep the in-memory read cache on")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare p50s against")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
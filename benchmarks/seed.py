@@ -0,0 +1,150 @@
+"""
+Synthetic data generator for benchmarks
+Creates N users (bench0, bench1, ...; password "benchmark") with a history
+of expenses across the expense categories in helpers.VALID_CATEGORIES,
+income from the income ones and a budget per category for every month in
+the window, then rebuilds the monthly rollups. Output is deterministic for
+a given --seed.
+
+    python benchmarks/seed.py --db /tmp/bench.db --users 2 --rows 100000 [--months 24] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import VALID_CATEGORIES
+
+PASSWORD = "benchmark"
+INCOME_SOURCES = ["Salary", "Freelance", "Investment"]
+EXPENSE_CATEGORIES = [category for category in VALID_CATEGORIES if category not in INCOME_SOURCES]
+NOTES = ["", "", "", "groceries", "monthly", "shared with friends", "card", "cash"]
+CHUNK_SIZE = 20000
+
+
+def month_keys(months, today):
+    """YYYY-MM keys of the last `months` months, oldest first"""
+    year, month = today.year, today.month
+    keys = []
+    for _ in range(months):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return keys[::-1]
+
+
+def expense_rows(rng, user_id, count, days, today):
+    from money import Money
+
+    for _ in range(count):
+        yield {
+            "user_id": user_id,
+            "amount": Money.from_cents(rng.randint(100, 30000)),
+            "category": rng.choice(EXPENSE_CATEGORIES),
+            "date": today - timedelta(days=rng.randrange(days)),
+            "note": rng.choice(NOTES),
+        }
+
+
+def income_rows(rng, user_id, count, days, today):
+    from money import Money
+
+    for _ in range(count):
+        yield {
+            "user_id": user_id,
+            "amount": Money.from_cents(rng.randint(50000, 500000)),
+            "source": rng.choice(INCOME_SOURCES),
+            "date": today - timedelta(days=rng.randrange(days)),
+        }
+
+
+def insert_chunked(model, rows):
+    from sqlalchemy import insert
+    from models import db
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(insert(model), chunk)
+            db.session.commit()
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+        db.session.commit()
+
+
+def seed(app, users, rows, income_rows_per_user=None, months=24, seed_value=1, verbose=False):
+    """Fill the app's database with synthetic users and history; returns the user ids"""
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+
+    from models import db, Budget, Expense, Income, User
+    from money import Money
+    from services import rollups
+    from services.budgets import TOTAL_MONTHLY
+
+    rng = random.Random(seed_value)
+    today = date.today()
+    days = months * 30
+    if income_rows_per_user is None:
+        income_rows_per_user = max(1, rows // 20)
+    password_hash = generate_password_hash(PASSWORD)
+
+    user_ids = []
+    with app.app_context():
+        first = db.session.query(db.func.count(User.id)).scalar()
+        for n in range(first, first + users):
+            started = time.perf_counter()
+            user = User(username=f"bench{n}", email=f"bench{n}@example.com", hash=password_hash)
+            db.session.add(user)
+            db.session.commit()
+            user_ids.append(user.id)
+
+            insert_chunked(Expense, expense_rows(rng, user.id, rows, days, today))
+            insert_chunked(Income, income_rows(rng, user.id, income_rows_per_user, days, today))
+            budgets = [
+                {"user_id": user.id, "category": category, "month": month,
+                 "budget_limit": Money.from_cents(rng.randint(10000, 100000))}
+                for month in month_keys(months, today)
+                for category in EXPENSE_CATEGORIES + [TOTAL_MONTHLY]
+            ]
+            db.session.execute(insert(Budget), budgets)
+            db.session.commit()
+            rollups.rebuild(user.id)
+            if verbose:
+                print(f"user bench{n} (id {user.id}): {rows} expenses, {income_rows_per_user} income, "
+                      f"{len(budgets)} budgets in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return user_ids
+
+
+def configure(db_path):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    os.environ["STORAGE_STARTUP_REPORT"] = "0"
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite file to create or add users to")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=1000, help="Expense rows per user (1k to 1M)")
+    parser.add_argument("--income-rows", type=int, default=None, help="Income rows per user (default rows/20)")
+    parser.add_argument("--months", type=int, default=24, help="History window")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    configure(args.db)
+    from app import create_app
+
+    user_ids = seed(create_app(), args.users, args.rows, args.income_rows, args.months, args.seed, verbose=True)
+    print(f"Seeded {len(user_ids)} user(s) into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
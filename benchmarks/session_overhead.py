@@ -0,0 +1,107 @@
+"""
+Per-request session overhead for each SESSION_BACKEND
+Runs an app per backend against a throwaway SQLite database and times two
+probe routes through the test client: one that only reads the session and one
+that modifies it (as a flash message does).
+
+    python benchmarks/session_overhead.py [--requests 2000] [--json]
+"""
+
+import argparse
+import json
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import session
+from werkzeug.security import generate_password_hash
+
+from services.sessions import BACKENDS
+
+
+def build_app(backend, workdir):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, backend + '.db')}"
+    os.environ["SESSION_BACKEND"] = backend
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+    os.chdir(workdir)  # the filesystem backend writes ./flask_session
+
+    from app import create_app
+    from models import db, User
+
+    app = create_app()
+
+    @app.route("/_bench/read")
+    def bench_read():
+        return str(session.get("user_id"))
+
+    @app.route("/_bench/write")
+    def bench_write():
+        session["hits"] = session.get("hits", 0) + 1
+        return str(session["hits"])
+
+    with app.app_context():
+        db.session.add(User(username="bench", email="bench@example.com", hash=generate_password_hash("benchmark")))
+        db.session.commit()
+    return app
+
+
+def time_requests(client, url, count):
+    """Per-request wall times in microseconds"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "mean_us": round(statistics.fmean(timings), 1),
+        "p50_us": round(timings[len(timings) // 2], 1),
+        "p95_us": round(timings[int(len(timings) * 0.95)], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        try:
+            for backend in args.backends:
+                client = build_app(backend, workdir).test_client()
+                client.post("/auth/login", data={"username": "bench", "password": "benchmark"})
+                if client.get("/_bench/read").data == b"None":
+                    raise SystemExit(f"{backend}: login did not stick")
+                time_requests(client, "/_bench/read", 50)  # warm up
+                results[backend] = {
+                    "read": summarize(time_requests(client, "/_bench/read", args.requests)),
+                    "write": summarize(time_requests(client, "/_bench/write", args.requests)),
+                }
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'backend':<12} {'scenario':<8} {'mean us':>10} {'p50 us':>10} {'p95 us':>10}")
+    for backend, scenarios in results.items():
+        for scenario, stats in scenarios.items():
+            print(f"{backend:<12} {scenario:<8} {stats['mean_us']:>10} {stats['p50_us']:>10} {stats['p95_us']:>10}")
+
+
+if __name__ == "__main__":
+    main()
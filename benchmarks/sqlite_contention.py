@@ -0,0 +1,132 @@
+"""
+SQLite contention under concurrent readers and writers
+Each profile from services.storage gets a fresh database. Reader processes
+run a grouped monthly-total query and writer processes insert one expense
+per transaction, all for a fixed duration. Reports throughput and
+"database is locked" failures per profile.
+
+    python benchmarks/sqlite_contention.py [--readers 4] [--writers 2] [--seconds 5] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_ROWS = 20000
+
+
+def _engine(path, profile):
+    from sqlalchemy import create_engine
+    from services.storage import install_pragmas, profile_pragmas
+
+    # Fail fast without a busy timeout so the default profile shows its lock errors
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+    install_pragmas(engine, profile_pragmas(profile))
+    return engine
+
+
+def seed(path, profile):
+    from sqlalchemy import text
+    from models import db
+
+    engine = _engine(path, profile)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hash) VALUES (1, 'bench', 'b@example.com', 'x')"))
+        conn.execute(
+            text("INSERT INTO expenses (user_id, amount, category, date, note) VALUES (1, :amount, :category, :date, '')"),
+            [{"amount": 100 + i % 5000, "category": ("Food", "Transport", "Shopping")[i % 3], "date": 739000 + i % 700}
+             for i in range(SEED_ROWS)]
+        )
+    engine.dispose()
+
+
+def worker(role, path, profile, start_at, deadline, results):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    engine = _engine(path, profile)
+    done = errors = 0
+    latencies = []
+    read = text("SELECT category, SUM(amount) FROM expenses WHERE user_id = 1 AND date >= :start GROUP BY category")
+    write = text("INSERT INTO expenses (user_id, amount, category, date, note) VALUES (1, 1234, 'Food', 739500, 'bench')")
+    time.sleep(max(0, start_at - time.time()))
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == "reader":
+                with engine.connect() as conn:
+                    conn.execute(read, {"start": 739300}).all()
+            else:
+                with engine.begin() as conn:
+                    conn.execute(write)
+            done += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    latencies.sort()
+    results.put((role, done, errors, latencies[int(len(latencies) * 0.95)] if latencies else None))
+
+
+def run_profile(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "contention.db")
+        seed(path, profile)
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        start_at = time.time() + 3  # leave time for the spawned interpreters to start
+        deadline = start_at + seconds
+        roles = ["reader"] * readers + ["writer"] * writers
+        processes = [ctx.Process(target=worker, args=(role, path, profile, start_at, deadline, results)) for role in roles]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    summary = {}
+    for role in ("reader", "writer"):
+        rows = [row for row in collected if row[0] == role]
+        p95s = [row[3] for row in rows if row[3] is not None]
+        summary[role] = {
+            "ops": sum(row[1] for row in rows),
+            "ops_per_sec": round(sum(row[1] for row in rows) / seconds, 1),
+            "locked_errors": sum(row[2] for row in rows),
+            "worst_p95_ms": round(max(p95s) * 1000, 2) if p95s else None,
+        }
+    return summary
+
+
+def main():
+    from services.storage import PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {profile: run_profile(profile, args.readers, args.writers, args.seconds) for profile in args.profiles}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'profile':<12} {'role':<7} {'ops/s':>10} {'locked':>8} {'p95 ms':>8}")
+    for profile, roles in results.items():
+        for role, stats in roles.items():
+            print(f"{profile:<12} {role:<7} {stats['ops_per_sec']:>10} {stats['locked_errors']:>8} {str(stats['worst_p95_ms']):>8}")
+
+
+if __name__ == "__main__":
+    main()
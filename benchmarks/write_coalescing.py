@@ -0,0 +1,139 @@
+"""
+Write throughput with and without the write-coalescing queue
+Starts several worker processes (like gunicorn workers) on one throwaway
+SQLite database. Each runs request threads that post single income entries
+through /income/add_income for a fixed duration. The run is done once with
+WRITE_COALESCING off and once with it on.
+
+    python benchmarks/write_coalescing.py [--processes 4] [--threads 4] [--seconds 5] [--json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "benchmark"
+
+
+def configure(path, coalescing, args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["WRITE_COALESCING"] = "1" if coalescing else "0"
+    os.environ["WRITE_MAX_BATCH"] = str(args.max_batch)
+    os.environ["WRITE_MAX_DELAY_MS"] = str(args.max_delay_ms)
+    os.environ["STORAGE_STARTUP_REPORT"] = "0"
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+    os.environ["GUNICORN_THREADS"] = str(args.threads)
+
+
+def seed(path, coalescing, args):
+    from werkzeug.security import generate_password_hash
+
+    configure(path, coalescing, args)
+    from app import create_app
+    from models import db, User
+
+    app = create_app()
+    password_hash = generate_password_hash(PASSWORD)
+    with app.app_context():
+        for n in range(args.processes * args.threads):
+            db.session.add(User(username=f"writer{n}", email=f"writer{n}@example.com", hash=password_hash))
+        db.session.commit()
+
+
+def post_writes(client, deadline, stats):
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        response = client.post("/income/add_income", data={"amount": "12.34", "date": "2026-10-01", "source": "Bench"})
+        if response.headers.get("Location", "").endswith("/dashboard"):
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        # Drop the flash so the session does not grow
+        with client.session_transaction() as session:
+            session.pop("_flashes", None)
+    stats.append((latencies, errors))
+
+
+def worker_process(index, path, coalescing, args, start_at, results):
+    configure(path, coalescing, args)
+    from app import create_app
+
+    app = create_app()
+    clients = []
+    for n in range(args.threads):
+        client = app.test_client()
+        client.post("/auth/login", data={"username": f"writer{index * args.threads + n}", "password": PASSWORD})
+        clients.append(client)
+
+    stats = []
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + args.seconds
+    threads = [threading.Thread(target=post_writes, args=(client, deadline, stats)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(stats)
+
+
+def run(coalescing, args, workdir):
+    path = os.path.join(workdir, f"writes-{int(coalescing)}.db")
+    seed(path, coalescing, args)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    start_at = time.time() + 5  # leave time for the workers to start and log in
+    processes = [
+        ctx.Process(target=worker_process, args=(index, path, coalescing, args, start_at, results))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    stats = [entry for _ in processes for entry in results.get()]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for thread_latencies, _ in stats for latency in thread_latencies)
+    return {
+        "writes": len(latencies),
+        "writes_per_sec": round(len(latencies) / args.seconds, 1),
+        "errors": sum(errors for _, errors in stats),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {mode: run(mode == "coalesced", args, workdir) for mode in ("direct", "coalesced")}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<10} {'writes/s':>10} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, stats in results.items():
+        print(f"{mode:<10} {stats['writes_per_sec']:>10} {stats['errors']:>7} {str(stats['p50_ms']):>8} {str(stats['p95_ms']):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, session, flash, url_for
+from flask import Blueprint, render_template, request, redirect, session, flash, url_for, current_app, abort
 from datetime import datetime
 from models import db, Expense
-from helpers import validate_amount, validate_date, validate_category, sanitize_text
+from helpers import validate_amount, validate_date, sanitize_text
 from sqlalchemy import func
+from services import batch, exporting, importer, pagination, periods, rollups
+from services.etag import conditional
 
 expenses_bp = Blueprint('expenses', __name__)
 
@@ -16,45 +18,39 @@ def add_expense():
     dates = request.form.getlist("date[]")
     notes = request.form.getlist("note[]")
 
-    error_count = 0
-    for amt, cat, dt, note in zip(amounts, categories, dates, notes):
-        is_valid, amount = validate_amount(amt)
-        if not is_valid:
-            flash(f"Invalid amount: {amount}")
-            error_count += 1
-            continue
-
-        is_valid, msg = validate_date(dt)
-        if not is_valid:
-            flash(msg)
-            error_count += 1
-            continue
-
-        is_valid, msg = validate_category(cat)
-        if not is_valid:
-            flash(msg)
-            error_count += 1
-            continue
+    rows = [
+        {"amount": amt, "category": cat, "date": dt, "note": note}
+        for amt, cat, dt, note in zip(amounts, categories, dates, notes)
+    ]
+    result = batch.ingest(Expense, session["user_id"], rows)
 
-        note = sanitize_text(note)
-
-        try:
-            expense = Expense(user_id=session["user_id"], amount=amount, category=cat, date=dt, note=note)
-            db.session.add(expense)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            flash(f"Error adding expense: {str(e)}")
-            error_count += 1
+    for number, msg in result.errors:
+        if number is None:
+            flash(f"Error adding expenses: {msg}")
+        else:
+            flash(f"Row {number}: {msg}" if len(rows) > 1 else msg)
+    unreported = result.rejected - sum(number is not None for number, _ in result.errors)
+    if unreported > 0:
+        flash(f"{unreported} more invalid row(s) not shown.")
 
-    success_count = len(amounts) - error_count
-    if success_count > 0:
-        flash(f"{success_count} expense(s) added successfully!")
+    if result.inserted > 0:
+        flash(f"{result.inserted} expense(s) added successfully!")
     
     return redirect(url_for("main.dashboard"))
 
 
+def _history_filters(user_id):
+    """Filter conditions shared by the history page and the exports"""
+    conditions = [Expense.user_id == user_id]
+    category = request.args.get("category", "")
+    if category:
+        conditions.append(Expense.category == category)
+    period = periods.between(request.args.get("start_date", ""), request.args.get("end_date", ""))
+    return conditions + periods.criteria(Expense.date, period)
+
+
 @expenses_bp.route("/expense_history")
+@conditional
 def expense_history():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
@@ -63,38 +59,85 @@ def expense_history():
     category = request.args.get("category", "")
     start_date = request.args.get("start_date", "")
     end_date = request.args.get("end_date", "")
-    page = int(request.args.get("page", 1))
     per_page = 10
 
-    query = Expense.query.filter_by(user_id=user_id)
+    query = Expense.query.filter(*_history_filters(user_id))
 
-    if category:
-        query = query.filter_by(category=category)
-    if start_date:
-        query = query.filter(Expense.date >= start_date)
-    if end_date:
-        query = query.filter(Expense.date <= end_date)
+    page = pagination.seek(
+        query, Expense, after=request.args.get("after"), before=request.args.get("before"), per_page=per_page
+    )
 
-    total_expenses = query.count()
-    total_pages = (total_expenses + per_page - 1) // per_page
+    # Unfiltered and category-only totals come from the rollup counts; date-filtered totals are opt-in
+    total_expenses = None
+    if not start_date and not end_date:
+        total_expenses = rollups.count(user_id, rollups.EXPENSE, category)
+    elif request.args.get("total"):
+        total_expenses = query.count()
 
-    expenses = query.order_by(Expense.date.desc()).limit(per_page).offset((page - 1) * per_page).all()
-    
-    categories_list = [row[0] for row in db.session.query(Expense.category).filter_by(user_id=user_id).distinct().all()]
+    categories_list = rollups.categories(user_id)
+    filters = {key: value for key, value in
+               (("category", category), ("start_date", start_date), ("end_date", end_date)) if value}
 
     return render_template(
         "expense_history.html",
-        expenses=expenses,
+        expenses=page.items,
         categories=categories_list,
         current_category=category,
         start_date=start_date,
         end_date=end_date,
-        page=page,
-        total_pages=total_pages,
+        filters=filters,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+        total_expenses=total_expenses,
         current_year=datetime.now().year
     )
 
 
+@expenses_bp.route("/export.<fmt>")
+def export(fmt):
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+    if fmt not in exporting.MIMETYPES:
+        abort(404)
+
+    return exporting.export_response(Expense, _history_filters(session["user_id"]), fmt, "expenses")
+
+
+@expenses_bp.route("/import_csv", methods=["POST"])
+def import_csv():
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV file to import.")
+        return redirect(url_for("expenses.expense_history"))
+    message = importer.too_large_message(upload)
+    if message:
+        flash(message)
+        return redirect(url_for("expenses.expense_history"))
+
+    def log_progress(result):
+        current_app.logger.info(
+            "CSV expense import for user %s: %s rows processed, %s imported",
+            session["user_id"], result.processed, result.inserted
+        )
+
+    try:
+        result = importer.import_csv(
+            importer.text_stream(upload.stream), Expense, session["user_id"],
+            chunk_size=current_app.config["IMPORT_CHUNK_SIZE"], progress=log_progress
+        )
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error importing CSV: {str(e)}")
+        return redirect(url_for("expenses.expense_history"))
+
+    for line, msg in result.errors[:5]:
+        flash(f"Line {line}: {msg}")
+    flash(f"Imported {result.inserted} expense row(s), {result.rejected} rejected.")
+    return redirect(url_for("expenses.expense_history"))
+
 @expenses_bp.route("/edit_expense/<int:expense_id>", methods=["GET", "POST"])
 def edit_expense(expense_id):
     if "user_id" not in session:
@@ -111,15 +154,21 @@ def edit_expense(expense_id):
             flash(f"Invalid amount: {amount}")
             return redirect(url_for("expenses.edit_expense", expense_id=expense_id))
 
+        is_valid, date = validate_date(request.form.get("date"))
+        if not is_valid:
+            flash(date)
+            return redirect(url_for("expenses.edit_expense", expense_id=expense_id))
+
         category = request.form.get("category")
-        date = request.form.get("date")
         note = sanitize_text(request.form.get("note", ""))
 
         try:
+            rollups.track(expense, sign=-1)
             expense.amount = amount
             expense.category = category
             expense.date = date
             expense.note = note
+            rollups.track(expense)
             db.session.commit()
             flash("Expense updated successfully.")
         except Exception as e:
@@ -139,6 +188,7 @@ def delete_expense(expense_id):
     try:
         expense = Expense.query.filter_by(id=expense_id, user_id=session["user_id"]).first()
         if expense:
+            rollups.track(expense, sign=-1)
             db.session.delete(expense)
             db.session.commit()
             flash("Expense deleted successfully.")
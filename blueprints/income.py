@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, redirect, session, flash, url_for
+from flask import Blueprint, render_template, request, redirect, session, flash, url_for, current_app, abort
 from datetime import datetime
 from models import db, Income
-from helpers import validate_amount, validate_date, sanitize_text
+from services import batch, exporting, importer, pagination, periods, rollups
+from services.etag import conditional
 
 income_bp = Blueprint('income', __name__)
 
@@ -11,38 +12,33 @@ def add_income():
         return redirect(url_for("auth.login"))
 
     if request.method == "POST":
-        is_valid, amount = validate_amount(request.form.get("amount"))
-        if not is_valid:
-            flash(f"Invalid amount: {amount}")
+        row = {
+            "amount": request.form.get("amount"),
+            "date": request.form.get("date"),
+            "source": request.form.get("source", "")
+        }
+        result = batch.ingest(Income, session["user_id"], [row])
+
+        for number, msg in result.errors:
+            flash(msg if number is not None else f"Error adding income: {msg}")
+        if not result.inserted:
             return redirect(url_for("income.add_income"))
 
-        date = request.form.get("date")
-        is_valid, msg = validate_date(date)
-        if not is_valid:
-            flash(msg)
-            return redirect(url_for("income.add_income"))
-
-        source = sanitize_text(request.form.get("source", ""))
-        if not source:
-            flash("Income source is required")
-            return redirect(url_for("income.add_income"))
-
-        try:
-            income = Income(user_id=session["user_id"], amount=amount, date=date, source=source)
-            db.session.add(income)
-            db.session.commit()
-            flash("Income added successfully!")
-        except Exception as e:
-            db.session.rollback()
-            flash(f"Error adding income: {str(e)}")
-
+        flash("Income added successfully!")
         return redirect(url_for("main.dashboard"))
 
     today = datetime.now().strftime("%Y-%m-%d")
     return render_template("add_income.html", today=today, current_year=datetime.now().year)
 
 
+def _history_filters(user_id):
+    """Filter conditions shared by the history page and the exports"""
+    period = periods.between(request.args.get("start_date", ""), request.args.get("end_date", ""))
+    return [Income.user_id == user_id] + periods.criteria(Income.date, period)
+
+
 @income_bp.route("/income_history")
+@conditional
 def income_history():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
@@ -50,32 +46,81 @@ def income_history():
     user_id = session["user_id"]
     start_date = request.args.get("start_date", "")
     end_date = request.args.get("end_date", "")
-    page = int(request.args.get("page", 1))
     per_page = 10
 
-    query = Income.query.filter_by(user_id=user_id)
+    query = Income.query.filter(*_history_filters(user_id))
 
-    if start_date:
-        query = query.filter(Income.date >= start_date)
-    if end_date:
-        query = query.filter(Income.date <= end_date)
+    page = pagination.seek(
+        query, Income, after=request.args.get("after"), before=request.args.get("before"), per_page=per_page
+    )
 
-    total_rows = query.count()
-    total_pages = (total_rows + per_page - 1) // per_page
+    # Unfiltered totals come from the rollup counts; date-filtered totals are opt-in
+    total_rows = None
+    if not start_date and not end_date:
+        total_rows = rollups.count(user_id, rollups.INCOME)
+    elif request.args.get("total"):
+        total_rows = query.count()
 
-    income = query.order_by(Income.date.desc()).limit(per_page).offset((page - 1) * per_page).all()
+    filters = {key: value for key, value in (("start_date", start_date), ("end_date", end_date)) if value}
 
     return render_template(
         "income_history.html",
-        income=income,
+        income=page.items,
         start_date=start_date,
         end_date=end_date,
-        page=page,
-        total_pages=total_pages,
+        filters=filters,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
+        total_rows=total_rows,
         current_year=datetime.now().year
     )
 
 
+@income_bp.route("/export.<fmt>")
+def export(fmt):
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+    if fmt not in exporting.MIMETYPES:
+        abort(404)
+
+    return exporting.export_response(Income, _history_filters(session["user_id"]), fmt, "income")
+
+
+@income_bp.route("/import_csv", methods=["POST"])
+def import_csv():
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        flash("Choose a CSV file to import.")
+        return redirect(url_for("income.income_history"))
+    message = importer.too_large_message(upload)
+    if message:
+        flash(message)
+        return redirect(url_for("income.income_history"))
+
+    def log_progress(result):
+        current_app.logger.info(
+            "CSV income import for user %s: %s rows processed, %s imported",
+            session["user_id"], result.processed, result.inserted
+        )
+
+    try:
+        result = importer.import_csv(
+            importer.text_stream(upload.stream), Income, session["user_id"],
+            chunk_size=current_app.config["IMPORT_CHUNK_SIZE"], progress=log_progress
+        )
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error importing CSV: {str(e)}")
+        return redirect(url_for("income.income_history"))
+
+    for line, msg in result.errors[:5]:
+        flash(f"Line {line}: {msg}")
+    flash(f"Imported {result.inserted} income row(s), {result.rejected} rejected.")
+    return redirect(url_for("income.income_history"))
+
 @income_bp.route("/delete_income/<int:income_id>")
 def delete_income(income_id):
     if "user_id" not in session:
@@ -84,6 +129,7 @@ def delete_income(income_id):
     try:
         income_record = Income.query.filter_by(id=income_id, user_id=session["user_id"]).first()
         if income_record:
+            rollups.track(income_record, sign=-1)
             db.session.delete(income_record)
             db.session.commit()
             flash("Income deleted successfully.")
@@ -1,14 +1,20 @@
-from flask import Blueprint, render_template, request, redirect, session, flash, url_for, Response
-from datetime import datetime, timedelta
-from io import BytesIO
-from fpdf import FPDF
+from flask import Blueprint, render_template, request, redirect, session, flash, url_for, abort, send_file, current_app
+from datetime import datetime
+from decimal import Decimal
 from helpers import validate_password, sanitize_text
 from werkzeug.security import check_password_hash, generate_password_hash
-from models import db, User, Expense, Income, Budget
+from models import db, User, Expense, Budget
+from money import Money
 from sqlalchemy import func
+from services import budgets, cache, pdf_reports, periods, rollups, trends, writes
+from services.dashboard import load_dashboard
+from services.etag import conditional
 
 main_bp = Blueprint('main', __name__)
 
+# Suggested budgets leave 15% headroom over average spending
+SUGGESTION_MARGIN = Decimal("1.15")
+
 @main_bp.route("/")
 def index():
     return render_template("landing.html", current_year=datetime.now().year)
@@ -21,86 +27,24 @@ def dashboard():
     user_id = session["user_id"]
 
     try:
-        income_total = db.session.query(func.sum(Income.amount)).filter_by(user_id=user_id).scalar() or 0
-        expense_total = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).scalar() or 0
-        balance = income_total - expense_total
-
-        current_month = datetime.now().strftime("%Y-%m")
-        income_month = db.session.query(func.sum(Income.amount)).filter_by(user_id=user_id).filter(
-            func.strftime('%Y-%m', Income.date) == current_month
-        ).scalar() or 0
-        expenses_month = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
-            func.strftime('%Y-%m', Expense.date) == current_month
-        ).scalar() or 0
-
-        categories = db.session.query(Expense.category, func.sum(Expense.amount)).filter_by(user_id=user_id).group_by(Expense.category).all()
-        expense_categories = [row[0] for row in categories] if categories else []
-        expense_amounts = [row[1] for row in categories] if categories else []
-
-        # Get budget data
-        budgets = Budget.query.filter_by(user_id=user_id, month=current_month).all()
-        budget_warnings = []
-        budget_data = []
-        
-        # Get total monthly budget
-        total_budget_limit = None
-        for budget in budgets:
-            if budget.category == 'TOTAL_MONTHLY':
-                total_budget_limit = budget.budget_limit
-                break
-        
-        total_budget_warning = None
-        if total_budget_limit:
-            if expenses_month > total_budget_limit:
-                total_budget_warning = {
-                    "limit": total_budget_limit,
-                    "spent": expenses_month,
-                    "exceeded": expenses_month - total_budget_limit
-                }
-        
-        for budget in budgets:
-            if budget.category == "TOTAL_MONTHLY":
-                continue
-            spent = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id, category=budget.category).filter(
-                func.strftime('%Y-%m', Expense.date) == current_month
-            ).scalar() or 0
-            percentage = (spent / budget.budget_limit * 100) if budget.budget_limit > 0 else 0
-            
-            budget_data.append({
-                "category": budget.category,
-                "limit": budget.budget_limit,
-                "spent": spent,
-                "remaining": max(0, budget.budget_limit - spent),
-                "percentage": min(percentage, 100),
-                "is_exceeded": spent > budget.budget_limit
-            })
-            
-            if spent > budget.budget_limit:
-                budget_warnings.append({
-                    "category": budget.category,
-                    "limit": budget.budget_limit,
-                    "spent": spent,
-                    "exceeded": spent - budget.budget_limit
-                })
-
-        months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-        income_data = [1000, 1200, 1500, 1300, 1100, 1600]
-        expenses_data = [500, 700, 800, 600, 500, 900]
+        current_month = periods.month_key()
+        data = cache.cached(user_id, "dashboard", current_month, lambda: load_dashboard(user_id, current_month))
+
+        trend_months = request.args.get("trend", type=int)
+        if trend_months not in trends.TREND_WINDOWS:
+            trend_months = current_app.config["TREND_MONTHS"]
+        months, income_data, expenses_data = trends.trend_series(
+            user_id, trend_months, data.income_month, data.expenses_month, current_month
+        )
 
         return render_template(
             "dashboard.html",
-            balance=balance,
-            income_month=income_month,
-            expenses_month=expenses_month,
-            expense_categories=expense_categories,
-            expense_amounts=expense_amounts,
+            **vars(data),
             months=months,
             income_data=income_data,
             expenses_data=expenses_data,
-            budget_warnings=budget_warnings,
-            budget_data=budget_data,
-            total_budget_limit=total_budget_limit,
-            total_budget_warning=total_budget_warning,
+            trend_months=trend_months,
+            trend_windows=trends.TREND_WINDOWS,
             current_year=datetime.now().year
         )
     except Exception as e:
@@ -111,62 +55,57 @@ def dashboard():
         return redirect(url_for("auth.login"))
 
 
-@main_bp.route("/reports")
-def reports():
-    if "user_id" not in session:
-        return redirect(url_for("auth.login"))
+def _report_totals(user_id, now):
+    """Template context for the reports page"""
+    current_month = periods.month_key(now)
+    last_month = periods.shift_month(current_month, -1)
+    current_year = now.strftime("%Y")
 
-    user_id = session["user_id"]
-    now = datetime.now()
+    # Last 7 days expenses
+    weekly_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
+        periods.last_n_days(7, now).filter(Expense.date)
+    ).scalar() or Money(0)
 
-    try:
-        current_month = now.strftime("%Y-%m")
-        last_month = (now.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
-        current_year = now.strftime("%Y")
+    # Current month expenses
+    monthly_expenses = rollups.total(user_id, rollups.EXPENSE, month=current_month)
 
-        # Last 7 days expenses
-        seven_days_ago = (now - timedelta(days=7)).strftime("%Y-%m-%d")
-        weekly_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
-            Expense.date >= seven_days_ago
-        ).scalar() or 0
+    # Current year expenses
+    yearly_expenses = rollups.total(user_id, rollups.EXPENSE, period=periods.year(current_year))
 
-        # Current month expenses
-        monthly_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
-            func.strftime('%Y-%m', Expense.date) == current_month
-        ).scalar() or 0
+    # Last month expenses
+    last_month_expenses = rollups.total(user_id, rollups.EXPENSE, month=last_month)
 
-        # Current year expenses
-        yearly_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
-            func.strftime('%Y', Expense.date) == current_year
-        ).scalar() or 0
+    categories = rollups.category_totals(user_id, descending=True)
 
-        # Last month expenses
-        last_month_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).filter(
-            func.strftime('%Y-%m', Expense.date) == last_month
-        ).scalar() or 0
+    category_labels = [row[0] for row in categories]
+    category_totals = [float(row[1]) for row in categories]
 
-        month_change = monthly_expenses - last_month_expenses
+    return dict(
+        weekly_expenses=weekly_expenses,
+        monthly_expenses=monthly_expenses,
+        yearly_expenses=yearly_expenses,
+        last_month_expenses=last_month_expenses,
+        month_change=monthly_expenses - last_month_expenses,
+        top_category=category_labels[0] if category_labels else "N/A",
+        category_labels=category_labels,
+        category_totals=category_totals,
+        current_year=current_year
+    )
 
-        categories = db.session.query(Expense.category, func.sum(Expense.amount)).filter_by(user_id=user_id).group_by(
-            Expense.category
-        ).order_by(func.sum(Expense.amount).desc()).all()
 
-        category_labels = [row[0] for row in categories]
-        category_totals = [row[1] for row in categories]
-        top_category = category_labels[0] if category_labels else "N/A"
+@main_bp.route("/reports")
+@conditional
+def reports():
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
 
-        return render_template(
-            "reports.html",
-            weekly_expenses=weekly_expenses,
-            monthly_expenses=monthly_expenses,
-            yearly_expenses=yearly_expenses,
-            last_month_expenses=last_month_expenses,
-            month_change=month_change,
-            top_category=top_category,
-            category_labels=category_labels,
-            category_totals=category_totals,
-            current_year=current_year
-        )
+    user_id = session["user_id"]
+    now = datetime.now()
+
+    try:
+        # Keyed by day because the weekly total is a rolling window
+        report = cache.cached(user_id, "reports", now.date(), lambda: _report_totals(user_id, now))
+        return render_template("reports.html", **report)
     except Exception as e:
         flash(f"Error loading reports: {str(e)}")
         return redirect(url_for("main.dashboard"))
@@ -182,51 +121,29 @@ def profile():
     try:
         user = User.query.get(user_id)
 
-        total_income = db.session.query(func.sum(Income.amount)).filter_by(user_id=user_id).scalar() or 0
+        total_income = rollups.total(user_id, rollups.INCOME)
 
-        total_expenses = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id).scalar() or 0
+        total_expenses = rollups.total(user_id, rollups.EXPENSE)
 
         balance = total_income - total_expenses
 
-        # Get total monthly budget
-        current_month = datetime.now().strftime("%Y-%m")
-        total_budget = Budget.query.filter_by(user_id=user_id, month=current_month, category='TOTAL_MONTHLY').first()
-        total_monthly_budget = total_budget.budget_limit if total_budget else None
-        
-        # Get budget suggestions from last 90 days using subquery
-        three_months_ago = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
-        
-        # Subquery to get monthly totals per category
-        monthly_totals = db.session.query(
-            Expense.category,
-            func.strftime('%Y-%m', Expense.date).label('month'),
-            func.sum(Expense.amount).label('monthly_total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.date >= three_months_ago
-        ).group_by(
-            Expense.category,
-            func.strftime('%Y-%m', Expense.date)
-        ).subquery()
+        # This month's budgets, including the total monthly budget, in one query
+        month_limits = budgets.month_limits(user_id, periods.month_key())
+        total_monthly_budget = month_limits.get(budgets.TOTAL_MONTHLY)
         
-        # Query to get average of monthly totals
-        category_data = db.session.query(
-            monthly_totals.c.category,
-            func.avg(monthly_totals.c.monthly_total).label('avg_spent')
-        ).group_by(monthly_totals.c.category).all()
+        # Get budget suggestions from the average monthly totals of the last 3 months
+        category_data = rollups.category_averages(user_id, periods.last_n_months(3))
         
         budget_suggestions = []
         for category, avg_spent in category_data:
             avg_spent = avg_spent or 0
-            suggested_budget = round(avg_spent * 1.15, 2)
-            
-            existing = Budget.query.filter_by(user_id=user_id, category=category, month=current_month).first()
+            suggested_budget = Money(avg_spent * SUGGESTION_MARGIN)
             
             budget_suggestions.append({
                 "category": category,
-                "avg_spent": round(avg_spent, 2),
+                "avg_spent": Money(avg_spent),
                 "suggested": suggested_budget,
-                "has_budget": existing is not None
+                "has_budget": category in month_limits
             })
 
         return render_template(
@@ -289,42 +206,33 @@ def export_pdf():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
 
-    user_id = session["user_id"]
-
     try:
-        expenses = Expense.query.filter_by(user_id=user_id).order_by(Expense.date.desc()).all()
-
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, "Expense Report", ln=True, align="C")
-        pdf.ln(10)
-
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(40, 10, "Date", 1)
-        pdf.cell(50, 10, "Category", 1)
-        pdf.cell(30, 10, "Amount", 1)
-        pdf.cell(70, 10, "Note", 1)
-        pdf.ln()
-
-        pdf.set_font("Arial", "", 12)
-        for exp in expenses:
-            pdf.cell(40, 10, exp.date, 1)
-            pdf.cell(50, 10, exp.category, 1)
-            pdf.cell(30, 10, f"${exp.amount:,.2f}", 1)
-            pdf.cell(70, 10, exp.note[:35] if exp.note else "", 1)
-            pdf.ln()
-
-        output = BytesIO()
-        pdf.output(output)
-        output.seek(0)
-
-        return Response(output, mimetype="application/pdf",
-                        headers={"Content-Disposition": "attachment; filename=expenses.pdf"})
+        job_id = pdf_reports.start_report(session["user_id"])
     except Exception as e:
         flash(f"Error generating PDF: {str(e)}")
         return redirect(url_for("main.dashboard"))
 
+    return redirect(url_for("main.pdf_report", job_id=job_id))
+
+
+@main_bp.route("/export_pdf/<job_id>")
+def pdf_report(job_id):
+    if "user_id" not in session:
+        return redirect(url_for("auth.login"))
+
+    if not pdf_reports.owns_report(job_id, session["user_id"]):
+        abort(404)
+
+    status = pdf_reports.report_status(job_id)
+    if status == pdf_reports.READY:
+        return send_file(pdf_reports.report_path(job_id), mimetype="application/pdf",
+                         as_attachment=True, download_name="expenses.pdf")
+    if status == pdf_reports.FAILED:
+        flash("Error generating PDF. Please try again.")
+        return redirect(url_for("main.dashboard"))
+
+    return render_template("report_status.html", job_id=job_id, current_year=datetime.now().year), 202
+
 
 @main_bp.route("/set_budget", methods=["POST"])
 def set_budget():
@@ -340,21 +248,12 @@ def set_budget():
         return redirect(url_for("main.profile"))
     
     try:
-        budget_limit = float(budget_limit)
+        budget_limit = Money(budget_limit)
         if budget_limit <= 0:
             flash("Budget limit must be greater than 0")
             return redirect(url_for("main.profile"))
         
-        current_month = datetime.now().strftime("%Y-%m")
-        existing = Budget.query.filter_by(user_id=user_id, category=category, month=current_month).first()
-        
-        if existing:
-            existing.budget_limit = budget_limit
-        else:
-            new_budget = Budget(user_id=user_id, category=category, budget_limit=budget_limit, month=current_month)
-            db.session.add(new_budget)
-        
-        db.session.commit()
+        writes.run(budgets.save_budgets, user_id, periods.month_key(), {category: budget_limit})
         flash(f"Budget set for {category}: ${budget_limit:.2f}")
     except ValueError:
         flash("Invalid budget amount")
@@ -378,21 +277,12 @@ def set_total_budget():
         return redirect(url_for("main.profile"))
     
     try:
-        total_limit = float(total_limit)
+        total_limit = Money(total_limit)
         if total_limit <= 0:
             flash("Budget limit must be greater than 0")
             return redirect(url_for("main.profile"))
         
-        current_month = datetime.now().strftime("%Y-%m")
-        existing = Budget.query.filter_by(user_id=user_id, category="TOTAL_MONTHLY", month=current_month).first()
-        
-        if existing:
-            existing.budget_limit = total_limit
-        else:
-            new_budget = Budget(user_id=user_id, category="TOTAL_MONTHLY", budget_limit=total_limit, month=current_month)
-            db.session.add(new_budget)
-        
-        db.session.commit()
+        writes.run(budgets.save_budgets, user_id, periods.month_key(), {budgets.TOTAL_MONTHLY: total_limit})
         flash(f"Total monthly budget set to ${total_limit:.2f}")
     except ValueError:
         flash("Invalid budget amount")
@@ -409,29 +299,21 @@ def set_budgets_bulk():
         return redirect(url_for("auth.login"))
 
     user_id = session["user_id"]
-    current_month = datetime.now().strftime("%Y-%m")
+    current_month = periods.month_key()
     
     try:
-        budgets = request.form
-        count = 0
-        
-        for key, value in budgets.items():
+        limits = {}
+        for key, value in request.form.items():
             if key.startswith("budget_") and value:
                 category = key.replace("budget_", "")
                 try:
-                    budget_limit = float(value)
+                    budget_limit = Money(value)
                     if budget_limit > 0:
-                        existing = Budget.query.filter_by(user_id=user_id, category=category, month=current_month).first()
-                        if existing:
-                            existing.budget_limit = budget_limit
-                        else:
-                            new_budget = Budget(user_id=user_id, category=category, budget_limit=budget_limit, month=current_month)
-                            db.session.add(new_budget)
-                        count += 1
+                        limits[category] = budget_limit
                 except ValueError:
                     continue
         
-        db.session.commit()
+        count = writes.run(budgets.save_budgets, user_id, current_month, limits)
         flash(f"Successfully set {count} budget(s)!")
     except Exception as e:
         db.session.rollback()
@@ -441,16 +323,17 @@ def set_budgets_bulk():
 
 
 @main_bp.route("/get_budgets")
+@conditional
 def get_budgets():
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
 
     user_id = session["user_id"]
-    current_month = datetime.now().strftime("%Y-%m")
+    current_month = periods.month_key()
     
     try:
-        budgets = Budget.query.filter_by(user_id=user_id, month=current_month).all()
-        budget_list = [{"category": b.category, "budget_limit": b.budget_limit} for b in budgets]
+        month_budgets = Budget.query.filter_by(user_id=user_id, month=current_month).all()
+        budget_list = [{"category": b.category, "budget_limit": float(b.budget_limit)} for b in month_budgets]
         return {"budgets": budget_list}
     except Exception as e:
         flash(f"Error loading budgets: {str(e)}")
@@ -458,6 +341,7 @@ def get_budgets():
 
 
 @main_bp.route("/get_budget_suggestions")
+@conditional
 def get_budget_suggestions():
     if "user_id" not in session:
         return {"suggestions": []}
@@ -465,39 +349,20 @@ def get_budget_suggestions():
     user_id = session["user_id"]
     
     try:
-        three_months_ago = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
-        
-        # Subquery to get monthly totals per category
-        monthly_totals = db.session.query(
-            Expense.category,
-            func.strftime('%Y-%m', Expense.date).label('month'),
-            func.sum(Expense.amount).label('monthly_total')
-        ).filter(
-            Expense.user_id == user_id,
-            Expense.date >= three_months_ago
-        ).group_by(
-            Expense.category,
-            func.strftime('%Y-%m', Expense.date)
-        ).subquery()
-        
-        # Query to get average of monthly totals
-        category_data = db.session.query(
-            monthly_totals.c.category,
-            func.avg(monthly_totals.c.monthly_total).label('avg_spent')
-        ).group_by(monthly_totals.c.category).all()
+        # Average monthly totals per category over the last 3 months
+        category_data = rollups.category_averages(user_id, periods.last_n_months(3))
+        month_limits = budgets.month_limits(user_id, periods.month_key())
         
         suggestions = []
         for category, avg_spent in category_data:
             avg_spent = avg_spent or 0
-            suggested_budget = round(avg_spent * 1.15, 2)
-            
-            existing = Budget.query.filter_by(user_id=user_id, category=category, month=datetime.now().strftime("%Y-%m")).first()
+            suggested_budget = Money(avg_spent * SUGGESTION_MARGIN)
             
             suggestions.append({
                 "category": category,
-                "avg_spent": round(avg_spent, 2),
-                "suggested": suggested_budget,
-                "has_budget": existing is not None
+                "avg_spent": float(Money(avg_spent)),
+                "suggested": float(suggested_budget),
+                "has_budget": category in month_limits
             })
         
         return {"suggestions": suggestions}
@@ -506,34 +371,17 @@ def get_budget_suggestions():
 
 
 @main_bp.route("/budgets")
+@conditional
 def budgets_page():
     """Display all per-category budgets for the current month"""
     if "user_id" not in session:
         return redirect(url_for("auth.login"))
     
     user_id = session["user_id"]
-    current_month = datetime.now().strftime("%Y-%m")
+    current_month = periods.month_key()
     
     try:
-        budgets = Budget.query.filter_by(user_id=user_id, month=current_month).filter(
-            Budget.category != 'TOTAL_MONTHLY'
-        ).order_by(Budget.category).all()
-        
-        budget_data = []
-        for budget in budgets:
-            spent = db.session.query(func.sum(Expense.amount)).filter_by(user_id=user_id, category=budget.category).filter(
-                func.strftime('%Y-%m', Expense.date) == current_month
-            ).scalar() or 0
-            
-            budget_data.append({
-                "id": budget.id,
-                "category": budget.category,
-                "limit": budget.budget_limit,
-                "spent": spent,
-                "remaining": max(0, budget.budget_limit - spent),
-                "percentage": min((spent / budget.budget_limit * 100) if budget.budget_limit > 0 else 0, 100),
-                "is_exceeded": spent > budget.budget_limit
-            })
+        budget_data = budgets.load_status(user_id, current_month).budget_data
         
         return render_template(
             "budgets.html",
@@ -555,13 +403,10 @@ def delete_budget(budget_id):
     user_id = session["user_id"]
     
     try:
-        budget = Budget.query.get(budget_id)
-        if not budget or budget.user_id != user_id:
+        if not writes.run(budgets.delete_budget, user_id, budget_id):
             flash("Budget not found")
             return redirect(url_for("main.budgets_page"))
         
-        db.session.delete(budget)
-        db.session.commit()
         flash("Budget deleted successfully")
         return redirect(url_for("main.budgets_page"))
     except Exception as e:
@@ -1,6 +1,5 @@
 # Input validation helpers
-from email_validator import validate_email, EmailNotValidError
-from decimal import Decimal
+from money import Money
 
 def validate_username(username):
     """Validate username format and length"""
@@ -12,6 +11,8 @@ def validate_username(username):
 
 def validate_email_address(email):
     """Validate email format"""
+    # email_validator is slow to import and only needed at registration
+    from email_validator import validate_email, EmailNotValidError
     try:
         validate_email(email)
         return True, ""
@@ -26,32 +27,33 @@ def validate_password(password):
         return False, "Password is too long"
     return True, ""
 
+MAX_AMOUNT = Money("999999.99")
+
 def validate_amount(amount_str):
-    """Validate monetary amount"""
-    try:
-        amount = float(amount_str)
-        if amount <= 0:
-            return False, "Amount must be greater than 0"
-        if amount > 999999.99:
-            return False, "Amount is too large"
-        return True, amount
-    except (ValueError, TypeError):
+    """Validate monetary amount, returning it as Money"""
+    amount = Money.parse(amount_str)
+    if amount is None:
         return False, "Invalid amount format"
+    if amount <= 0:
+        return False, "Amount must be greater than 0"
+    if amount > MAX_AMOUNT:
+        return False, "Amount is too large"
+    return True, amount
 
 def validate_date(date_str):
-    """Validate date format (YYYY-MM-DD)"""
+    """Validate date format (YYYY-MM-DD), returning it as a date"""
     try:
-        datetime.strptime(date_str, "%Y-%m-%d")
-        return True, ""
-    except ValueError:
+        return True, datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (ValueError, TypeError):
         return False, "Invalid date format (use YYYY-MM-DD)"
 
+VALID_CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Healthcare", 
+                    "Shopping", "Salary", "Freelance", "Investment", "Other"]
+
 def validate_category(category):
     """Validate expense/income category"""
-    valid_categories = ["Food", "Transport", "Utilities", "Entertainment", "Healthcare", 
-                       "Shopping", "Salary", "Freelance", "Investment", "Other"]
-    if category not in valid_categories:
-        return False, f"Invalid category. Must be one of: {', '.join(valid_categories)}"
+    if category not in VALID_CATEGORIES:
+        return False, f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}"
     return True, ""
 
 def sanitize_text(text, max_length=500):
@@ -1,82 +1,29 @@
 """
 Database initialization script
-Creates tables and indexes for the Expense Tracker application
+Creates or upgrades the Expense Tracker database at DATABASE_URL by running
+the app's numbered migrations, so it gets the same tables and indexes as a
+database created by the app itself
 """
 
-import sqlite3
 import os
 
-DATABASE = "database.db"
+os.environ["SCHEMA_CHECK"] = "0"  # migrate explicitly below so the applied steps can be reported
+
+from app import create_app
+from migrations import SCHEMA_VERSION, migrate
+from models import db
+
 
 def init_db():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create income table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS income (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            amount REAL NOT NULL,
-            date TEXT NOT NULL,
-            source TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create expenses table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            amount REAL NOT NULL,
-            category TEXT NOT NULL,
-            date TEXT NOT NULL,
-            note TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Create budgets table (for future budget feature)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS budgets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            category TEXT NOT NULL,
-            budget_limit REAL NOT NULL,
-            month TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-            UNIQUE(user_id, category, month)
-        )
-    ''')
-    
-    # Create indexes for performance optimization
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_income_user_id ON income(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_income_date ON income(date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_id ON expenses(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budgets_user_id ON budgets(user_id)')
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"✓ Database '{DATABASE}' initialized successfully!")
+    """Initialize or upgrade the database to the current schema version"""
+    app = create_app()
+    with app.app_context():
+        applied = migrate(db.engine)
+        url = db.engine.url.render_as_string()
+
+    for version, description in applied:
+        print(f"  applied migration {version}: {description}")
+    print(f"✓ Database '{url}' initialized successfully (schema version {SCHEMA_VERSION})")
 
 if __name__ == "__main__":
     init_db()
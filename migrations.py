@@ -0,0 +1,333 @@
+"""
+Numbered schema migrations
+Databases created by init_db.py and by the app both go through the same list
+of numbered migrations, so they end up with one schema: the model tables, the
+performance indexes and backfilled rollups. Each migration is idempotent and
+runs in its own short transaction together with the row that records it in
+schema_version. On SQLite that transaction takes the write lock up front
+(BEGIN IMMEDIATE), so a migration waits for in-flight writes instead of
+failing, concurrent workers apply it only once, and WAL readers keep running
+while it does. A normal startup costs one query: the stored version.
+"""
+
+import re
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import BigInteger, Date, Integer, bindparam, func, insert, inspect, literal, select, text, union_all
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models import db, Expense, Income, MonthlyRollup, ORDINAL_EPOCH
+
+MONEY_COLUMNS = {
+    "expenses": ["amount"],
+    "income": ["amount"],
+    "budgets": ["budget_limit"],
+    "monthly_rollups": ["total"],
+}
+
+DATE_COLUMNS = {
+    "expenses": ["date"],
+    "income": ["date"],
+}
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _column_types(conn, table):
+    return {row[1]: (row[2] or "").upper() for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+
+def _rebuild_table(conn, name, conversions):
+    """Recreate a table from its current model definition, converting columns with SQL expressions"""
+    table = db.metadata.tables[name]
+    dialect = sqlite.dialect()
+    old_columns = set(_column_types(conn, name))
+    index_sql = [
+        row[0] for row in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (name,)
+        )
+    ]
+
+    conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME TO "{name}__old"')
+    conn.exec_driver_sql(str(CreateTable(table).compile(dialect=dialect)))
+
+    columns = [column.name for column in table.columns if column.name in old_columns]
+    select_list = ", ".join(conversions.get(column, f'"{column}"') for column in columns)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    conn.exec_driver_sql(f'INSERT INTO "{name}" ({column_list}) SELECT {select_list} FROM "{name}__old"')
+    conn.exec_driver_sql(f'DROP TABLE "{name}__old"')
+
+    for index in table.indexes:
+        conn.exec_driver_sql(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
+    for sql in index_sql:
+        conn.exec_driver_sql(sql.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1).replace(
+            "CREATE UNIQUE INDEX ", "CREATE UNIQUE INDEX IF NOT EXISTS ", 1))
+
+
+def _pending(conn, columns_by_table, expression):
+    """{table: {column: conversion SQL}} for listed columns not yet stored as INTEGER"""
+    pending = {}
+    for table, columns in columns_by_table.items():
+        types = _column_types(conn, table)
+        columns = [column for column in columns if column in types and types[column] != "INTEGER"]
+        if columns:
+            pending[table] = {column: expression(column) for column in columns}
+    return pending
+
+
+def money_to_cents(conn):
+    """Convert REAL dollar columns to INTEGER cents"""
+    return _pending(conn, MONEY_COLUMNS, lambda column: f'CAST(ROUND("{column}" * 100) AS INTEGER)')
+
+
+def _is_iso_date(value):
+    """True for a valid YYYY-MM-DD string"""
+    if not isinstance(value, str) or not _ISO_DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def repair_dates(conn, columns):
+    """Rewrite text dates that are not plain YYYY-MM-DD before they are converted
+
+    Values that start with a valid date (e.g. a timestamp) keep that date;
+    anything else becomes the row's creation day, or today. Both SQLite and
+    PostgreSQL run this first, so a malformed date is treated the same way on
+    both instead of one falling back and the other aborting the migration.
+    """
+    for table, column in columns:
+        values = conn.execute(text(f'SELECT DISTINCT "{column}" FROM "{table}"')).scalars().all()
+        unparseable = []
+        for value in values:
+            if _is_iso_date(value):
+                continue
+            prefix = str(value).strip()[:10]
+            if _is_iso_date(prefix):
+                conn.execute(text(f'UPDATE "{table}" SET "{column}" = :day WHERE "{column}" = :value'),
+                             {"day": prefix, "value": value})
+            else:
+                unparseable.append(value)
+        if not unparseable:
+            continue
+        rows = conn.execute(
+            text(f'SELECT id, created_at FROM "{table}" WHERE "{column}" IN :values')
+            .bindparams(bindparam("values", expanding=True)),
+            {"values": unparseable},
+        ).all()
+        for row_id, created_at in rows:
+            day = str(created_at or "")[:10]
+            conn.execute(
+                text(f'UPDATE "{table}" SET "{column}" = :day WHERE id = :id'),
+                {"day": day if _is_iso_date(day) else date.today().isoformat(), "id": row_id},
+            )
+
+
+def dates_to_days(conn):
+    """Convert TEXT YYYY-MM-DD date columns to INTEGER day numbers"""
+    # repair_dates has already replaced unparseable dates; the fallbacks only guard against formats it missed
+    return _pending(conn, DATE_COLUMNS, lambda column: (
+        f'CAST(COALESCE(julianday("{column}"), julianday("created_at"), julianday(\'now\'))'
+        f' - {ORDINAL_EPOCH} AS INTEGER)'
+    ))
+
+
+def _server_money_columns(conn):
+    """[(table, column, USING expression or None)] for money columns not yet BIGINT cents"""
+    inspector = inspect(conn)
+    pending = []
+    for table, columns in MONEY_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        types = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column not in types or isinstance(types[column], BigInteger):
+                continue
+            # INTEGER columns already hold cents and only need widening; REAL and NUMERIC ones hold dollars
+            using = None if isinstance(types[column], Integer) else f'round("{column}" * 100)'
+            pending.append((table, column, using))
+    return pending
+
+
+def _server_date_columns(conn):
+    """[(table, column, USING expression)] for date columns not yet stored as DATE"""
+    inspector = inspect(conn)
+    pending = []
+    for table, columns in DATE_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        types = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+        pending.extend(
+            (table, column, f'"{column}"::date') for column in columns
+            if column in types and not isinstance(types[column], Date)
+        )
+    return pending
+
+
+def _require_alter_using(conn, pending):
+    """Refuse to run on databases other than PostgreSQL that still have columns to convert"""
+    if pending and conn.dialect.name != "postgresql":
+        columns = ", ".join(f"{table}.{column}" for table, column, _ in pending)
+        raise RuntimeError(f"{columns} must be converted to integer cents and DATE by hand on {conn.dialect.name}")
+
+
+def _convert_server_columns(conn, pending, sql_type):
+    """ALTER the pending (table, column, USING expression) columns to sql_type in place (PostgreSQL)"""
+    for table, column, using in pending:
+        clause = f" USING {using}" if using else ""
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE {sql_type}{clause}')
+
+
+# Migrations
+
+def create_tables(conn):
+    """Create any model table that does not exist yet"""
+    db.metadata.create_all(conn)
+
+
+def integer_money_and_dates(conn):
+    """Rebuild tables from init_db.py or older versions with REAL money and TEXT dates
+
+    Other databases convert the columns in place; ones without ALTER COLUMN
+    ... TYPE ... USING refuse to start until they have been converted by hand.
+    """
+    if conn.dialect.name != "sqlite":
+        money, dates = _server_money_columns(conn), _server_date_columns(conn)
+        _require_alter_using(conn, money + dates)
+        repair_dates(conn, [(table, column) for table, column, _ in dates])
+        _convert_server_columns(conn, money, "BIGINT")
+        _convert_server_columns(conn, dates, "DATE")
+        return
+    repair_dates(conn, [(table, column) for table, columns in dates_to_days(conn).items() for column in columns])
+    # Conversions are collected first so each table is rebuilt once with all of its changes
+    pending = {}
+    for conversion in (money_to_cents, dates_to_days):
+        for table, conversions in conversion(conn).items():
+            pending.setdefault(table, {}).update(conversions)
+    for table, conversions in pending.items():
+        _rebuild_table(conn, table, conversions)
+
+
+def create_indexes(conn):
+    """Create every index declared on the models that is missing"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def backfill_rollups(conn):
+    """Build monthly rollups for users whose rows predate the rollup table"""
+    from services.rollups import EXPENSE, INCOME, month_expression
+
+    rows = union_all(
+        select(Expense.user_id, month_expression(Expense.date).label("month"),
+               Expense.category.label("category"), literal(EXPENSE).label("kind"), Expense.amount),
+        select(Income.user_id, month_expression(Income.date).label("month"),
+               Income.source.label("category"), literal(INCOME).label("kind"), Income.amount),
+    ).subquery()
+    buckets = select(
+        rows.c.user_id, rows.c.month, rows.c.category, rows.c.kind, func.sum(rows.c.amount), func.count()
+    ).where(
+        rows.c.user_id.not_in(select(MonthlyRollup.user_id).distinct())
+    ).group_by(rows.c.user_id, rows.c.month, rows.c.category, rows.c.kind)
+    conn.execute(insert(MonthlyRollup).from_select(["user_id", "month", "category", "kind", "total", "count"], buckets))
+
+
+# Single-column indexes from init_db.py, superseded by the composite covering indexes on the models
+SUPERSEDED_INDEXES = [
+    "idx_expenses_user_id",
+    "idx_expenses_date",
+    "idx_expenses_category",
+    "idx_income_user_id",
+    "idx_income_date",
+]
+
+
+def covering_indexes(conn):
+    """Create the composite covering indexes and drop the single-column ones they replace"""
+    create_indexes(conn)
+    for name in SUPERSEDED_INDEXES:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+
+# Append only: a migration's number is recorded in every database it has been applied to
+MIGRATIONS = [
+    (1, "create tables", create_tables),
+    (2, "integer money and dates", integer_money_and_dates),
+    (3, "performance indexes", create_indexes),
+    (4, "backfill monthly rollups", backfill_rollups),
+    (5, "covering indexes", covering_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def stored_schema_version(engine):
+    """Schema version recorded in the database, or None if it has never been stamped"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+def _create_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+
+
+def migrate(engine, redo=False):
+    """Apply pending migrations in order, returning [(version, description)] of those applied
+
+    With redo, every migration runs again; they are idempotent, so this only
+    repairs databases whose schema drifted from what schema_version records.
+    """
+    _create_version_table(engine)
+    current = 0 if redo else stored_schema_version(engine) or 0
+    applied = []
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.connect() as conn:
+            if conn.dialect.name == "sqlite":
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            # Another worker may have applied it while this one waited for the lock
+            stored = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+            if version <= stored and not redo:
+                continue
+            migration(conn)
+            conn.execute(text("DELETE FROM schema_version WHERE version = :version"), {"version": version})
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+            conn.commit()
+        applied.append((version, description))
+    return applied
+
+
+def ensure_schema(engine):
+    """Apply pending migrations unless the stored schema version is current
+
+    Returns the migrations applied, or None if the schema was already current.
+    """
+    if stored_schema_version(engine) == SCHEMA_VERSION:
+        return None
+    return migrate(engine)
+
+
+@click.command("migrate-data")
+@click.option("--redo", is_flag=True, help="Re-run every migration, not just pending ones")
+@with_appcontext
+def migrate_data_command(redo):
+    """Bring an existing database up to the current schema version"""
+    for version, description in migrate(db.engine, redo=redo):
+        click.echo(f"Applied migration {version}: {description}")
+    click.echo(f"Database is at schema version {SCHEMA_VERSION}")
@@ -3,11 +3,51 @@ SQLAlchemy models for the Expense Tracker application
 """
 
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import date, datetime
+from sqlalchemy.types import Date, Integer, TypeDecorator
+from money import MoneyType
 
 db = SQLAlchemy()
 
 
+def upsert(table):
+    """Dialect-specific INSERT supporting ON CONFLICT DO UPDATE"""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+# julianday() minus this offset is the day number DayNumber stores (date.toordinal())
+ORDINAL_EPOCH = 1721424.5
+
+
+class DayNumber(TypeDecorator):
+    """datetime.date stored as an integer day number on SQLite and a native DATE elsewhere"""
+    impl = Date
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(Integer())
+        return dialect.type_descriptor(Date())
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        elif isinstance(value, datetime):
+            value = value.date()
+        return value.toordinal() if dialect.name == "sqlite" else value
+    
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return date.fromordinal(value)
+
+
 class User(db.Model):
     """User model for authentication"""
     __tablename__ = 'users'
@@ -22,6 +62,7 @@ class User(db.Model):
     expenses = db.relationship('Expense', backref='user', lazy=True, cascade='all, delete-orphan')
     income = db.relationship('Income', backref='user', lazy=True, cascade='all, delete-orphan')
     budgets = db.relationship('Budget', backref='user', lazy=True, cascade='all, delete-orphan')
+    rollups = db.relationship('MonthlyRollup', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -33,12 +74,18 @@ class Expense(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(MoneyType, nullable=False)  # Stored as integer cents
     category = db.Column(db.String(50), nullable=False)
-    date = db.Column(db.String(10), nullable=False)  # Format: YYYY-MM-DD
+    date = db.Column(DayNumber, nullable=False)
     note = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Covering indexes: per-user date ranges and category filters summing amount never touch the table
+    __table_args__ = (
+        db.Index('idx_expenses_user_date_amount', 'user_id', 'date', 'amount'),
+        db.Index('idx_expenses_user_category_date_amount', 'user_id', 'category', 'date', 'amount'),
+    )
+    
     def __repr__(self):
         return f'<Expense {self.id}: {self.category} ${self.amount}>'
 
@@ -49,11 +96,15 @@ class Income(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    date = db.Column(db.String(10), nullable=False)  # Format: YYYY-MM-DD
+    amount = db.Column(MoneyType, nullable=False)  # Stored as integer cents
+    date = db.Column(DayNumber, nullable=False)
     source = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_income_user_date_source_amount', 'user_id', 'date', 'source', 'amount'),
+    )
+    
     def __repr__(self):
         return f'<Income {self.id}: {self.source} ${self.amount}>'
 
@@ -65,11 +116,59 @@ class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
-    budget_limit = db.Column(db.Float, nullable=False)
+    budget_limit = db.Column(MoneyType, nullable=False)  # Stored as integer cents
     month = db.Column(db.String(7), nullable=False)  # Format: YYYY-MM
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'category', 'month', name='unique_user_category_month'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', 'month', name='unique_user_category_month'),
+        db.Index('idx_budgets_user_id', 'user_id'),
+    )
     
     def __repr__(self):
         return f'<Budget {self.id}: {self.category} ${self.budget_limit}>'
+
+
+class MonthlyRollup(db.Model):
+    """Pre-aggregated per-user monthly totals for expenses and income"""
+    __tablename__ = 'monthly_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # Format: YYYY-MM
+    category = db.Column(db.String(100), nullable=False)  # Expense category or income source
+    kind = db.Column(db.String(10), nullable=False)  # 'expense' or 'income'
+    total = db.Column(MoneyType, nullable=False, default=0)  # Stored as integer cents
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', 'category', 'kind', name='unique_user_month_category_kind'),
+        # Per-kind category breakdowns group by category without a temp B-tree
+        db.Index('idx_rollups_user_kind_category_month_total', 'user_id', 'kind', 'category', 'month', 'total'),
+    )
+    
+    def __repr__(self):
+        return f'<MonthlyRollup {self.user_id} {self.month} {self.kind}:{self.category} ${self.total}>'
+
+
+class DataVersion(db.Model):
+    """Per-user counter bumped by every write, used to validate cached reads"""
+    __tablename__ = 'data_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.user_id}: {self.version}>'
+
+
+class ServerSession(db.Model):
+    """Server-side session record for SESSION_BACKEND=sqlalchemy"""
+    __tablename__ = 'sessions'
+    
+    session_id = db.Column(db.String(255), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    expiry = db.Column(db.DateTime, nullable=False, index=True)  # Indexed for bulk pruning
+    
+    def __repr__(self):
+        return f'<ServerSession {self.session_id[:8]} expires {self.expiry}>'
@@ -0,0 +1,71 @@
+"""
+Exact money handling
+Amounts are Money values (Decimal dollars rounded to the cent) in Python and
+integer cents in the database, so sums and budget comparisons are exact
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy.types import BigInteger, Integer, TypeDecorator
+
+CENT = Decimal("0.01")
+
+
+class Money(Decimal):
+    """Dollar amount with exact cent precision"""
+
+    def __new__(cls, value=0):
+        if isinstance(value, float):
+            value = repr(value)
+        try:
+            amount = Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValueError(f"Invalid money value: {value!r}")
+        if not amount.is_finite():
+            raise ValueError(f"Invalid money value: {value!r}")
+        return super().__new__(cls, amount)
+
+    @classmethod
+    def from_cents(cls, cents):
+        if isinstance(cents, float):
+            cents = repr(cents)
+        return cls(Decimal(cents).scaleb(-2))
+
+    @classmethod
+    def parse(cls, text):
+        """Parse user input, returning None if it is not a finite number"""
+        try:
+            return cls(str(text).strip())
+        except (ValueError, TypeError):
+            return None
+
+    @property
+    def cents(self):
+        return int(self.scaleb(2))
+
+    def usd(self):
+        return f"${self:,.2f}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+
+class MoneyType(TypeDecorator):
+    """Stores Money as an INTEGER number of cents (BIGINT outside SQLite, whose INTEGER is already 64-bit)"""
+    impl = Integer
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(Integer())
+        return dialect.type_descriptor(BigInteger())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return Money(value).cents
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Money.from_cents(value)
@@ -0,0 +1,2 @@
+# Services package
+# Query and maintenance helpers shared by the blueprints
@@ -0,0 +1,109 @@
+"""
+Batch ingestion for expenses and income
+All rows are validated up front, the valid ones are written with a single
+executemany INSERT plus one rollup upsert, and the transaction commits once
+"""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert
+
+from helpers import validate_amount, validate_date, validate_category, sanitize_text
+from models import db, Expense, Income
+from services import rollups, writes
+
+# Errors kept per batch or import; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch: rows written, rows rejected and the first MAX_REPORTED_ERRORS (row_number, message) errors"""
+    inserted: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+
+def validate_expense(user_id, row):
+    """Validate raw expense fields, returning (True, mapping) or (False, message)"""
+    is_valid, amount = validate_amount(row.get("amount"))
+    if not is_valid:
+        return False, f"Invalid amount: {amount}"
+
+    is_valid, date = validate_date(row.get("date"))
+    if not is_valid:
+        return False, date
+
+    is_valid, msg = validate_category(row.get("category"))
+    if not is_valid:
+        return False, msg
+
+    return True, {
+        "user_id": user_id,
+        "amount": amount,
+        "category": row["category"],
+        "date": date,
+        "note": sanitize_text(row.get("note", ""))
+    }
+
+
+def validate_income(user_id, row):
+    """Validate raw income fields, returning (True, mapping) or (False, message)"""
+    is_valid, amount = validate_amount(row.get("amount"))
+    if not is_valid:
+        return False, f"Invalid amount: {amount}"
+
+    is_valid, date = validate_date(row.get("date"))
+    if not is_valid:
+        return False, date
+
+    source = sanitize_text(row.get("source", ""), max_length=100)
+    if not source:
+        return False, "Income source is required"
+
+    return True, {"user_id": user_id, "amount": amount, "date": date, "source": source}
+
+
+VALIDATORS = {Expense: validate_expense, Income: validate_income}
+
+
+def validate_rows(model, user_id, rows, start=1):
+    """Split raw rows into valid mappings and [(row_number, message)] errors"""
+    validate = VALIDATORS[model]
+    mappings = []
+    errors = []
+    for number, row in enumerate(rows, start=start):
+        is_valid, result = validate(user_id, row)
+        if is_valid:
+            mappings.append(result)
+        else:
+            errors.append((number, result))
+    return mappings, errors
+
+
+def insert_mappings(model, mappings):
+    """Write validated mappings and their rollup deltas in the current transaction"""
+    if not mappings:
+        return 0
+    db.session.execute(insert(model), mappings)
+    rollups.apply_deltas(rollups.deltas_for(model, mappings))
+    return len(mappings)
+
+
+def ingest(model, user_id, rows, commit=True):
+    """Validate, insert and commit a batch of raw rows in one transaction (or savepoint, when coalescing)"""
+    mappings, errors = validate_rows(model, user_id, rows)
+    result = BatchResult(rejected=len(errors), errors=errors[:MAX_REPORTED_ERRORS])
+    if not mappings:
+        return result
+
+    try:
+        if commit:
+            result.inserted = writes.run(insert_mappings, model, mappings)
+        else:
+            result.inserted = insert_mappings(model, mappings)
+    except Exception as e:
+        db.session.rollback()
+        result.inserted = 0
+        result.errors.append((None, str(e)))
+    return result
@@ -0,0 +1,123 @@
+"""
+Budget status engine
+Builds the budget progress and warning structures shared by the dashboard and
+budgets page from one batch of (budget, spent) rows instead of a SUM per budget
+"""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, insert
+
+from models import db, Budget, MonthlyRollup
+from money import Money
+from services import cache, rollups
+
+TOTAL_MONTHLY = "TOTAL_MONTHLY"
+
+
+@dataclass
+class BudgetStatus:
+    """Budget progress for one month"""
+    budget_data: list = field(default_factory=list)
+    budget_warnings: list = field(default_factory=list)
+    total_budget_limit: Money = None
+    total_budget_warning: dict = None
+
+
+def build_status(budgets, spent_by_category, expenses_month=0):
+    """Build BudgetStatus from [(id, category, limit)] and {category: spent} for the month"""
+    status = BudgetStatus()
+
+    for budget_id, category, limit in budgets:
+        if category == TOTAL_MONTHLY:
+            status.total_budget_limit = limit
+            if expenses_month > limit:
+                status.total_budget_warning = {
+                    "limit": limit,
+                    "spent": expenses_month,
+                    "exceeded": expenses_month - limit
+                }
+
+    for budget_id, category, limit in budgets:
+        if category == TOTAL_MONTHLY:
+            continue
+        spent = spent_by_category.get(category) or 0
+        percentage = (spent / limit * 100) if limit > 0 else 0
+
+        status.budget_data.append({
+            "id": budget_id,
+            "category": category,
+            "limit": limit,
+            "spent": spent,
+            "remaining": max(0, limit - spent),
+            "percentage": min(percentage, 100),
+            "is_exceeded": spent > limit
+        })
+
+        if spent > limit:
+            status.budget_warnings.append({
+                "category": category,
+                "limit": limit,
+                "spent": spent,
+                "exceeded": spent - limit
+            })
+
+    return status
+
+
+def load_status(user_id, month):
+    """Load the month's category budgets joined to grouped spending in one query"""
+    spent = db.session.query(
+        MonthlyRollup.category.label("category"),
+        func.sum(MonthlyRollup.total).label("spent")
+    ).filter_by(user_id=user_id, month=month, kind=rollups.EXPENSE).group_by(MonthlyRollup.category).subquery()
+
+    rows = db.session.query(Budget.id, Budget.category, Budget.budget_limit, spent.c.spent).outerjoin(
+        spent, spent.c.category == Budget.category
+    ).filter(
+        Budget.user_id == user_id,
+        Budget.month == month,
+        Budget.category != TOTAL_MONTHLY
+    ).order_by(Budget.category).all()
+
+    budgets = [(budget_id, category, limit) for budget_id, category, limit, _ in rows]
+    spent_by_category = {category: amount for _, category, _, amount in rows}
+    return build_status(budgets, spent_by_category)
+
+
+def month_limits(user_id, month):
+    """{category: limit} for every budget the user has in a month, TOTAL_MONTHLY included"""
+    return dict(db.session.query(Budget.category, Budget.budget_limit).filter_by(user_id=user_id, month=month))
+
+
+def save_budgets(user_id, month, limits):
+    """Create or update the month's budgets from {category: limit}; a write job for writes.run"""
+    existing = {
+        budget.category: budget
+        for budget in Budget.query.filter(
+            Budget.user_id == user_id, Budget.month == month, Budget.category.in_(list(limits))
+        )
+    }
+    new_rows = []
+    for category, limit in limits.items():
+        if category in existing:
+            existing[category].budget_limit = limit
+        else:
+            new_rows.append({"user_id": user_id, "category": category, "budget_limit": limit, "month": month})
+    # One executemany; ORM adds would run an INSERT ... RETURNING per row on SQLite
+    if new_rows:
+        db.session.execute(insert(Budget), new_rows)
+    db.session.flush()
+    cache.mark_dirty(user_id)
+    return len(limits)
+
+
+def delete_budget(user_id, budget_id):
+    """Delete one of the user's budgets, returning False if it does not exist; a write job for writes.run"""
+    budget = db.session.get(Budget, budget_id)
+    if not budget or budget.user_id != user_id:
+        return False
+    db.session.delete(budget)
+    db.session.flush()
+    cache.mark_dirty(user_id)
+    return True
@@ -0,0 +1,221 @@
+"""
+Per-user read cache for derived views
+Results are cached under (user_id, view, period) with LRU eviction and a TTL.
+Every write bumps the user's data_version in the same transaction, and each
+entry remembers the version it was computed at, so one primary-key lookup
+tells any worker whether an entry is still current. Entries of dirty users
+are also dropped from the local backend once the write commits.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, upsert, DataVersion
+
+DIRTY_KEY = "read_cache_dirty_users"
+
+
+class NullBackend:
+    """Caching disabled; every read recomputes"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def invalidate(self, user_ids):
+        pass
+
+
+class MemoryBackend:
+    """In-process LRU with a TTL, private to one worker"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in user_ids]:
+                del self._entries[key]
+
+
+class SQLiteBackend:
+    """LRU with a TTL in a local SQLite file, shared by every worker on the host"""
+
+    def __init__(self, path, max_entries=1024, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    user_id INTEGER NOT NULL,
+                    view TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (user_id, view, period)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries(accessed)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires FROM cache_entries WHERE user_id = ? AND view = ? AND period = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM cache_entries WHERE user_id = ? AND view = ? AND period = ?", key)
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed = ? WHERE user_id = ? AND view = ? AND period = ?", (now, *key)
+            )
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + self.ttl, now)
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN ("
+                "SELECT rowid FROM cache_entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def invalidate(self, user_ids):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM cache_entries WHERE user_id = ?", [(user_id,) for user_id in user_ids])
+
+
+def init_app(app):
+    """Create the backend selected by READ_CACHE_BACKEND (memory, sqlite or none)"""
+    name = app.config.get("READ_CACHE_BACKEND", "memory")
+    max_entries = app.config.get("READ_CACHE_MAX_ENTRIES", 1024)
+    ttl = app.config.get("READ_CACHE_TTL", 300)
+    if name == "memory":
+        backend = MemoryBackend(max_entries, ttl)
+    elif name == "sqlite":
+        path = app.config.get("READ_CACHE_PATH") or os.path.join(app.instance_path, "read_cache.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        backend = SQLiteBackend(path, max_entries, ttl)
+    elif name == "none":
+        backend = NullBackend()
+    else:
+        raise ValueError(f"Unknown READ_CACHE_BACKEND: {name}")
+    app.extensions["read_cache"] = backend
+
+
+def _backend():
+    return current_app.extensions.get("read_cache") or NullBackend()
+
+
+def data_version(user_id):
+    """Current write counter for a user (0 before their first write), looked up once per request"""
+    versions = g.setdefault("data_versions", {})
+    if user_id not in versions:
+        versions[user_id] = db.session.execute(
+            select(DataVersion.version).where(DataVersion.user_id == user_id)
+        ).scalar() or 0
+    return versions[user_id]
+
+
+def _forget_versions(user_ids=None):
+    versions = g.get("data_versions")
+    if versions:
+        for user_id in list(versions) if user_ids is None else user_ids:
+            versions.pop(user_id, None)
+
+
+def cached(user_id, view, period, compute):
+    """Return the cached result for (user_id, view, period), computing and storing it on a miss"""
+    key = (user_id, view, str(period))
+    backend = _backend()
+    if isinstance(backend, NullBackend):
+        return compute()
+
+    version = data_version(user_id)
+    entry = backend.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    # Tagging with the version read before computing means a racing write can only cause a miss
+    value = compute()
+    backend.set(key, (version, value))
+    return value
+
+
+def mark_dirty(*user_ids):
+    """Bump the users' data versions in the current transaction and drop their cached views on commit"""
+    dirty = db.session.info.setdefault(DIRTY_KEY, set())
+    pending = set(user_ids) - dirty
+    if not pending:
+        return
+
+    table = DataVersion.__table__
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_={"version": table.c.version + 1})
+    db.session.execute(stmt, [{"user_id": user_id, "version": 1} for user_id in pending])
+    dirty.update(pending)
+    _forget_versions(pending)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop(DIRTY_KEY, None)
+    if user_ids and has_app_context():
+        _backend().invalidate(user_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session, previous_transaction):
+    # The version bumps were rolled back too, so the next write must bump again
+    if session.info.pop(DIRTY_KEY, None) and has_app_context():
+        _forget_versions()
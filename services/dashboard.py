@@ -0,0 +1,83 @@
+"""
+Dashboard data service
+Loads every dashboard tile in one round trip: the user's rollup buckets and
+current-month budgets are combined with UNION ALL and aggregated with
+conditional sums, so the query count does not grow with the number of budgets
+"""
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import case, func, literal, literal_column, null, select, type_coerce, union_all
+
+from models import db, Budget, MonthlyRollup
+from money import Money, MoneyType
+from services import rollups
+from services.budgets import build_status
+
+
+@dataclass
+class DashboardData:
+    """Everything dashboard.html renders apart from the trend chart"""
+    balance: Money = Money(0)
+    income_month: Money = Money(0)
+    expenses_month: Money = Money(0)
+    expense_categories: list = field(default_factory=list)
+    expense_amounts: list = field(default_factory=list)
+    budget_data: list = field(default_factory=list)
+    budget_warnings: list = field(default_factory=list)
+    total_budget_limit: Money = None
+    total_budget_warning: dict = None
+
+
+def _dashboard_statement(user_id, month):
+    """UNION ALL of per-(kind, category) rollup sums and the month's budgets"""
+    totals = select(
+        literal("rollup").label("source"),
+        MonthlyRollup.kind.label("kind"),
+        MonthlyRollup.category.label("category"),
+        func.sum(MonthlyRollup.total).label("all_time"),
+        func.sum(case((MonthlyRollup.month == month, MonthlyRollup.total), else_=0)).label("this_month"),
+        null().label("budget_id"),
+        type_coerce(null(), MoneyType).label("budget_limit"),
+    ).where(MonthlyRollup.user_id == user_id).group_by(MonthlyRollup.kind, MonthlyRollup.category)
+
+    budgets = select(
+        literal("budget"),
+        literal("budget"),
+        Budget.category,
+        null(),
+        null(),
+        Budget.id,
+        Budget.budget_limit,
+    ).where(Budget.user_id == user_id, Budget.month == month)
+
+    return union_all(totals, budgets).order_by(literal_column("category"))
+
+
+def load_dashboard(user_id, month):
+    """Compute the dashboard tiles for a user and YYYY-MM month in a single statement"""
+    data = DashboardData()
+    income_total = expense_total = 0
+    spent_by_category = {}
+    budgets = []
+
+    for row in db.session.execute(_dashboard_statement(user_id, month)):
+        if row.source == "budget":
+            budgets.append((row.budget_id, row.category, row.budget_limit))
+        elif row.kind == rollups.INCOME:
+            income_total += row.all_time or 0
+            data.income_month += row.this_month or 0
+        else:
+            expense_total += row.all_time or 0
+            data.expenses_month += row.this_month or 0
+            spent_by_category[row.category] = row.this_month or 0
+            data.expense_categories.append(row.category)
+            data.expense_amounts.append(float(row.all_time or 0))
+
+    data.balance = income_total - expense_total
+    status = build_status(budgets, spent_by_category, data.expenses_month)
+    data.budget_data = status.budget_data
+    data.budget_warnings = status.budget_warnings
+    data.total_budget_limit = status.total_budget_limit
+    data.total_budget_warning = status.total_budget_warning
+    return data
@@ -0,0 +1,102 @@
+"""
+Streaming CSV / NDJSON export
+Rows are selected column-by-column with yield_per and written through a
+generator response, so memory stays flat and the header goes out before the
+query has finished
+"""
+
+import csv
+import json
+
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from models import db, Expense, Income
+
+YIELD_PER = 1000
+
+EXPORT_COLUMNS = {
+    Expense: ("date", "amount", "category", "note"),
+    Income: ("date", "amount", "source"),
+}
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class _LineBuffer:
+    """File-like sink that hands back whatever csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def _format(name, value):
+    if value is None:
+        return ""
+    if name == "amount":
+        return f"{value:.2f}"
+    text = str(value)
+    if text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def _json_value(name, value):
+    if value is None:
+        return None
+    if name == "amount":
+        return float(value)
+    return str(value)
+
+
+def _csv_header(names):
+    return csv.writer(_LineBuffer()).writerow(names)
+
+
+def _csv_chunks(names, rows):
+    writer = csv.writer(_LineBuffer())
+    for partition in rows.partitions():
+        yield "".join(writer.writerow([_format(n, v) for n, v in zip(names, row)]) for row in partition)
+
+
+def _ndjson_chunks(names, rows):
+    for partition in rows.partitions():
+        yield "".join(
+            json.dumps({n: _json_value(n, v) for n, v in zip(names, row)}) + "\n"
+            for row in partition
+        )
+
+
+def export_statement(model, conditions):
+    """Column-projected, newest-first SELECT for an export"""
+    columns = [getattr(model, name) for name in EXPORT_COLUMNS[model]]
+    return select(*columns).where(*conditions).order_by(model.date.desc(), model.id.desc())
+
+
+def export_response(model, conditions, fmt, filename):
+    """Stream the rows matching conditions as a CSV or NDJSON download"""
+    names = list(EXPORT_COLUMNS[model])
+    stmt = export_statement(model, conditions).execution_options(yield_per=YIELD_PER)
+
+    def generate():
+        if fmt == "csv":
+            # Send the header before the query runs so the download starts immediately
+            yield _csv_header(names)
+        rows = db.session.execute(stmt)
+        try:
+            chunks = _csv_chunks if fmt == "csv" else _ndjson_chunks
+            yield from chunks(names, rows)
+        finally:
+            rows.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
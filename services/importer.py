@@ -0,0 +1,141 @@
+"""
+Streaming CSV import for expenses and income
+Rows are parsed one at a time from the uploaded stream and written through the
+batch ingestion path in fixed-size chunks, one writes.run job per chunk, so memory
+stays bounded by the chunk size rather than the file size. Web uploads run
+inside the request, so they are capped at IMPORT_MAX_UPLOAD_BYTES; larger
+files go through `flask import-csv`.
+"""
+
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, Expense, Income, User
+from services import batch, writes
+from services.batch import MAX_REPORTED_ERRORS
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_MAX_UPLOAD_BYTES = 2 * 1024 * 1024  # roughly 50k rows, a few seconds of importing
+
+MODELS = {"expense": Expense, "income": Income}
+
+
+@dataclass
+class ImportResult:
+    """Running totals for an import; only the first MAX_REPORTED_ERRORS errors are kept"""
+    processed: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_errors(self, errors):
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+
+def _normalize(row):
+    """Lower-case header names and strip whitespace from values"""
+    return {(key or "").strip().lower(): (value or "").strip() for key, value in row.items() if key}
+
+
+def upload_size(upload):
+    """Size in bytes of an uploaded file, leaving its stream at the start"""
+    upload.stream.seek(0, os.SEEK_END)
+    size = upload.stream.tell()
+    upload.stream.seek(0)
+    return size
+
+
+def too_large_message(upload):
+    """Flash message for an upload over IMPORT_MAX_UPLOAD_BYTES, or None if it fits"""
+    limit = current_app.config.get("IMPORT_MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)
+    if upload_size(upload) <= limit:
+        return None
+    return (f"{upload.filename} is larger than {limit / (1024 * 1024):g} MB, too large to import here. "
+            "Split it into smaller files, or have it imported with `flask import-csv`.")
+
+
+def text_stream(binary_stream):
+    """Wrap an uploaded binary stream for csv parsing without reading it into memory"""
+    return io.TextIOWrapper(binary_stream, encoding="utf-8-sig", newline="")
+
+
+def import_csv(stream, model, user_id, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Import CSV rows from a text stream, committing every chunk_size rows
+
+    Expense files need date, amount and category columns (note optional);
+    income files need date, amount and source. progress(result) is called
+    after every chunk.
+    """
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    chunk = []
+    first_line = 2  # line 1 is the header
+
+    for row in reader:
+        chunk.append(_normalize(row))
+        if len(chunk) >= chunk_size:
+            _import_chunk(model, user_id, chunk, first_line, result)
+            first_line += len(chunk)
+            chunk = []
+            if progress:
+                progress(result)
+
+    if chunk:
+        _import_chunk(model, user_id, chunk, first_line, result)
+        if progress:
+            progress(result)
+
+    return result
+
+
+def _import_chunk(model, user_id, rows, first_line, result):
+    """Validate and write one chunk as its own write job"""
+    mappings, errors = batch.validate_rows(model, user_id, rows, start=first_line)
+    result.processed += len(rows)
+    result.rejected += len(errors)
+    result.add_errors(errors)
+    if not mappings:
+        return
+
+    last_line = first_line + len(rows) - 1
+    try:
+        result.inserted += writes.run(batch.insert_mappings, model, mappings)
+    except writes.WriteQueueBusy as e:
+        # The chunk may still commit, so it is neither counted as imported nor rejected
+        result.add_errors([(first_line, f"Lines {first_line}-{last_line} not confirmed: {e}")])
+    except Exception as e:
+        db.session.rollback()
+        result.rejected += len(mappings)
+        result.add_errors([(first_line, f"Lines {first_line}-{last_line} not imported: {e}")])
+
+
+@click.command("import-csv")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user-id", type=int, required=True, help="Owner of the imported rows")
+@click.option("--kind", type=click.Choice(sorted(MODELS)), default="expense", show_default=True)
+@click.option("--chunk-size", type=int, default=None, help="Rows per transaction (defaults to IMPORT_CHUNK_SIZE)")
+@with_appcontext
+def import_csv_command(path, user_id, kind, chunk_size):
+    """Import expenses or income for a user from a CSV file"""
+    if db.session.get(User, user_id) is None:
+        raise click.BadParameter(f"no user with id {user_id}", param_hint="--user-id")
+
+    chunk_size = chunk_size or current_app.config.get("IMPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+    def report(result):
+        click.echo(f"{result.processed} rows processed, {result.inserted} imported, {result.rejected} rejected")
+
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        result = import_csv(stream, MODELS[kind], user_id, chunk_size=chunk_size, progress=report)
+
+    for line, msg in result.errors:
+        click.echo(f"line {line}: {msg}")
+    click.echo(f"Done: {result.inserted} {kind} row(s) imported, {result.rejected} rejected")
@@ -0,0 +1,124 @@
+"""
+Index advisor
+Requests every parameterless GET route (plus the filtered history pages and
+exports) through the test client as an existing user, captures the SELECTs
+they run and shows SQLite's EXPLAIN QUERY PLAN for each. Plans that scan a
+whole table or index, or build a temporary B-tree to sort or group, are
+flagged as candidates for a better index.
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+
+from models import db, User
+from services import cache
+
+# Routes with side effects or background work that are not worth planning
+SKIPPED_ENDPOINTS = {"static", "auth.logout", "main.export_pdf"}
+
+# Variants that exercise the filter and export queries as well
+EXTRA_PATHS = [
+    "/expenses/expense_history?start_date=2000-01-01&end_date=2100-01-01",
+    "/expenses/expense_history?category=Food",
+    "/expenses/expense_history?category=Food&start_date=2000-01-01&end_date=2100-01-01&total=1",
+    "/expenses/export.csv",
+    "/income/income_history?start_date=2000-01-01&end_date=2100-01-01&total=1",
+    "/income/export.csv",
+]
+
+
+def route_paths(app):
+    """GET routes that take no URL arguments, followed by EXTRA_PATHS"""
+    paths = sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if "GET" in rule.methods and not rule.arguments and rule.endpoint not in SKIPPED_ENDPOINTS
+    )
+    return paths + EXTRA_PATHS
+
+
+def capture_queries(app, user_id, paths):
+    """Capture every SELECT run while requesting paths as user_id
+
+    Returns ({(statement, parameters): [paths]}, {path: status} for responses other than 200).
+    """
+    captured = {}
+    failures = {}
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            key = (statement, tuple(parameters or ()))
+            captured.setdefault(key, []).append(request_path)
+
+    # Cached reads would hide the queries behind them
+    backend = app.extensions.get("read_cache")
+    app.extensions["read_cache"] = cache.NullBackend()
+    event.listen(db.engine, "before_cursor_execute", _record)
+    logger_disabled, app.logger.disabled = app.logger.disabled, True
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = user_id
+        for request_path in paths:
+            status = client.get(request_path).status_code
+            if status != 200:
+                failures[request_path] = status
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+        app.logger.disabled = logger_disabled
+        app.extensions["read_cache"] = backend
+    return captured, failures
+
+
+def is_flagged(detail):
+    """True for plan steps that read a whole table or index or sort into a temp B-tree"""
+    # RIGHT PART sorts only rows tied on the index order (e.g. same-day rows by id) and stops at the LIMIT
+    return detail.startswith("SCAN") or ("TEMP B-TREE" in detail and "RIGHT PART" not in detail)
+
+
+def query_plans(captured):
+    """[(statement, paths, [plan detail])] for the captured queries"""
+    plans = []
+    with db.engine.connect() as conn:
+        for (statement, parameters), paths in captured.items():
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append((statement, sorted(set(paths)), [row[-1] for row in rows]))
+    return plans
+
+
+@click.command("index-advisor")
+@click.option("--user-id", type=int, default=None, help="User to request pages as (default: the first user)")
+@click.option("--all", "show_all", is_flag=True, help="Show every query plan, not just flagged ones")
+@click.option("--strict", is_flag=True, help="Exit with an error if any plan is flagged")
+@with_appcontext
+def index_advisor_command(user_id, show_all, strict):
+    """Flag full scans and temp B-trees in the query plans of every route"""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("index-advisor reads SQLite query plans; point DATABASE_URL at a SQLite file")
+    if user_id is None:
+        user_id = db.session.scalar(select(User.id).order_by(User.id).limit(1))
+        if user_id is None:
+            raise click.ClickException("No users in the database; register one or pass --user-id")
+
+    app = current_app._get_current_object()
+    captured, failures = capture_queries(app, user_id, route_paths(app))
+    plans = query_plans(captured)
+
+    flagged = 0
+    for statement, paths, details in plans:
+        bad = [detail for detail in details if is_flagged(detail)]
+        flagged += bool(bad)
+        if not bad and not show_all:
+            continue
+        click.echo(f"{'FLAG' if bad else 'ok  '} {', '.join(paths)}")
+        click.echo(f"     {' '.join(statement.split())[:300]}")
+        for detail in details:
+            click.echo(f"     {'!' if detail in bad else ' '} {detail}")
+        click.echo()
+
+    for path, status in failures.items():
+        click.echo(f"note {path} answered {status}; its queries may be incomplete")
+    click.echo(f"{len(plans)} distinct quer{'y' if len(plans) == 1 else 'ies'}, {flagged} flagged")
+    if strict and flagged:
+        raise SystemExit(1)
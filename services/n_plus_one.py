@@ -0,0 +1,123 @@
+"""
+N+1 query detection
+With N_PLUS_ONE set, every statement a request runs is reduced to its shape
+(whitespace collapsed, literals and IN lists folded) and counted. A shape that
+runs more than N_PLUS_ONE_THRESHOLD times in one request is almost always a
+query inside a loop. "warn" logs it; "raise" (or "warn" while app.testing is
+on) fails the request with NPlusOneError once the view has returned, so a
+view's own try/except cannot swallow it.
+
+For tests, count_queries() and assert_query_budget() check a route against a
+maximum number of statements; tests/conftest.py wraps the latter as the
+query_budget fixture:
+
+    def test_dashboard(client, query_budget):
+        query_budget(client, "/dashboard", max_queries=6)
+"""
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+MODES = ("off", "warn", "raise")
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+class NPlusOneError(AssertionError):
+    """A statement shape ran more often in one request than the threshold allows"""
+
+
+def fingerprint(statement):
+    """Shape of a statement with literals and parameter lists folded, so loop iterations compare equal"""
+    shape = " ".join(statement.split())
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("(?)", shape)
+
+
+def repeated(shapes, threshold):
+    """[(shape, count)] for shapes in a Counter that ran more than threshold times"""
+    return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+
+def _describe(shape, count):
+    return f"{count}x {shape[:200]}"
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    shapes = g.get("query_shapes")
+    if shapes is None:
+        shapes = g.query_shapes = Counter()
+    shape = fingerprint(statement)
+    shapes[shape] += 1
+    if shapes[shape] == current_app.config.get("N_PLUS_ONE_THRESHOLD", 5) + 1:
+        current_app.logger.warning("Possible N+1 in %s %s: %s", request.method, request.path, shape[:200])
+
+
+def init_app(app):
+    """Count statement shapes per request unless N_PLUS_ONE is off"""
+    mode = app.config.get("N_PLUS_ONE", "off")
+    if mode not in MODES:
+        raise ValueError(f"Unknown N_PLUS_ONE mode: {mode}")
+    if mode == "off":
+        return
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _count_statement)
+
+    @app.after_request
+    def _check_query_shapes(response):
+        if mode != "raise" and not app.testing:
+            return response
+        found = repeated(g.get("query_shapes") or Counter(), app.config.get("N_PLUS_ONE_THRESHOLD", 5))
+        if found:
+            details = "; ".join(_describe(shape, count) for shape, count in found)
+            raise NPlusOneError(f"N+1 queries in {request.method} {request.path}: {details}")
+        return response
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Collect every statement run on the engine inside the block, from any thread"""
+    engine = engine or db.engine
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def assert_query_budget(client, path, max_queries, max_repeats=None, method="GET", **kwargs):
+    """Request path with a test client and fail if it runs more than max_queries statements
+
+    max_repeats also fails the request if any one statement shape runs more
+    than that many times. Returns the response.
+    """
+    with client.application.app_context(), count_queries() as statements:
+        response = client.open(path, method=method, **kwargs)
+    problems = []
+    if len(statements) > max_queries:
+        problems.append(f"{len(statements)} queries (budget {max_queries})")
+    if max_repeats is not None:
+        problems.extend(_describe(shape, count)
+                        for shape, count in repeated(Counter(map(fingerprint, statements)), max_repeats))
+    if problems:
+        listing = "\n".join(f"  {statement}" for statement in statements)
+        raise NPlusOneError(f"{method} {path}: {'; '.join(problems)}\n{listing}")
+    return response
+
@@ -0,0 +1,77 @@
+"""
+Keyset (seek) pagination for history pages
+Pages are ordered newest first on (date, id) and addressed by opaque cursors,
+so fetching any page costs O(page size) no matter how deep it is
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import tuple_
+
+# Row ids are 64-bit integers in every supported database; larger values overflow the driver
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+
+@dataclass
+class Page:
+    """One page of rows plus cursors for its neighbours"""
+    items: list
+    next_cursor: str = None
+    prev_cursor: str = None
+
+
+def encode_cursor(row):
+    """Opaque cursor for a row's (date, id) position"""
+    raw = json.dumps([str(row.date), row.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return (date, id) for a cursor, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        day, row_id = json.loads(raw)
+        day, row_id = date.fromisoformat(day), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not MIN_ID <= row_id <= MAX_ID:
+        return None
+    return day, row_id
+
+
+def seek(query, model, after=None, before=None, per_page=10):
+    """Fetch the page after (older than) or before (newer than) a cursor"""
+    key = tuple_(model.date, model.id)
+    after = decode_cursor(after)
+    before = decode_cursor(before) if after is None else None
+
+    if before is not None:
+        rows = query.filter(key > before).order_by(model.date.asc(), model.id.asc()).limit(per_page + 1).all()
+        if not rows:
+            # Nothing newer any more (e.g. rows were deleted), fall back to the first page
+            return seek(query, model, per_page=per_page)
+        has_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if after is not None:
+            query = query.filter(key < after)
+        rows = query.order_by(model.date.desc(), model.id.desc()).limit(per_page + 1).all()
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = after is not None
+
+    if not rows:
+        return Page(items=[])
+
+    return Page(
+        items=rows,
+        next_cursor=encode_cursor(rows[-1]) if has_older else None,
+        prev_cursor=encode_cursor(rows[0]) if has_newer else None
+    )
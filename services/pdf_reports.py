@@ -0,0 +1,150 @@
+"""
+Background PDF expense reports
+Reports are built in a process pool from column-projected rows fetched in
+chunks, and written atomically to the report directory. Any web worker can
+tell whether a report is ready by looking for its file; a job marker written
+at submit time tells a report still being built from one that was lost.
+"""
+
+import os
+import time
+import uuid
+
+from flask import current_app
+
+from models import db
+
+CHUNK_SIZE = 1000
+REPORT_TTL = 3600  # seconds a finished report is kept
+REPORT_TIMEOUT = 600  # seconds after which a report that is neither built nor failed counts as failed
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+_executor = None
+
+
+def _get_executor():
+    """Process pool shared by the worker, created on first use"""
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get("PDF_EXPORT_WORKERS", 1),
+            mp_context=get_context("spawn")
+        )
+    return _executor
+
+
+def report_dir():
+    path = current_app.config.get("PDF_REPORT_DIR") or os.path.join(current_app.instance_path, "reports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_path(job_id, suffix=".pdf"):
+    return os.path.join(report_dir(), job_id + suffix)
+
+
+def owns_report(job_id, user_id):
+    """Job ids are prefixed with the owner's id"""
+    return job_id.split("-", 1)[0] == str(user_id)
+
+
+def start_report(user_id):
+    """Queue a PDF report for a user and return its job id"""
+    _prune_reports()
+    job_id = f"{user_id}-{uuid.uuid4().hex}"
+    database_url = db.engine.url.render_as_string(hide_password=False)
+    open(report_path(job_id, ".job"), "w").close()
+    future = _get_executor().submit(build_report, database_url, user_id, report_path(job_id))
+    future.add_done_callback(_record_failure(report_path(job_id, ".err")))
+    return job_id
+
+
+def _record_failure(err_path):
+    """Done-callback that writes the .err file for jobs that died outside build_report (e.g. a crashed pool)"""
+    def _done(future):
+        error = "cancelled" if future.cancelled() else future.exception()
+        if error is not None and not os.path.exists(err_path):
+            with open(err_path, "w") as f:
+                f.write(str(error) or type(error).__name__)
+    return _done
+
+
+def report_status(job_id):
+    if os.path.exists(report_path(job_id)):
+        return READY
+    if os.path.exists(report_path(job_id, ".err")):
+        return FAILED
+    try:
+        started = os.path.getmtime(report_path(job_id, ".job"))
+    except OSError:  # never queued here, or pruned
+        return FAILED
+    if time.time() - started > REPORT_TIMEOUT:
+        return FAILED
+    return PENDING
+
+
+def _prune_reports():
+    """Remove finished reports older than REPORT_TTL"""
+    cutoff = time.time() - REPORT_TTL
+    for entry in os.scandir(report_dir()):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def build_report(database_url, user_id, path):
+    """Render a user's expenses to path; runs inside the process pool"""
+    from fpdf import FPDF
+    from sqlalchemy import create_engine, select
+    from models import Expense
+
+    class ExpenseReport(FPDF):
+        def header(self):
+            if self.page_no() == 1:
+                self.set_font("Helvetica", "B", 16)
+                self.cell(0, 10, "Expense Report", new_x="LMARGIN", new_y="NEXT", align="C")
+                self.ln(10)
+            self.set_font("Helvetica", "B", 12)
+            self.cell(40, 10, "Date", 1)
+            self.cell(50, 10, "Category", 1)
+            self.cell(30, 10, "Amount", 1)
+            self.cell(70, 10, "Note", 1)
+            self.ln()
+            self.set_font("Helvetica", "", 12)
+
+    engine = create_engine(database_url)
+    tmp_path = path + ".tmp"
+    try:
+        pdf = ExpenseReport()
+        pdf.add_page()
+
+        stmt = select(Expense.date, Expense.category, Expense.amount, Expense.note).where(
+            Expense.user_id == user_id
+        ).order_by(Expense.date.desc(), Expense.id.desc())
+
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=CHUNK_SIZE).execute(stmt)
+            for partition in result.partitions():
+                for date, category, amount, note in partition:
+                    pdf.cell(40, 10, str(date), 1)
+                    pdf.cell(50, 10, category, 1)
+                    pdf.cell(30, 10, f"${amount:,.2f}", 1)
+                    pdf.cell(70, 10, note[:35] if note else "", 1)
+                    pdf.ln()
+
+        pdf.output(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        with open(os.path.splitext(path)[0] + ".err", "w") as f:
+            f.write(str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    finally:
+        engine.dispose()
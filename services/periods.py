@@ -0,0 +1,112 @@
+"""
+Reporting periods as half-open date ranges
+Filters compare the raw date column (date >= start AND date < end) so that
+SQLite can seek on the date indexes with plain integer day-number keys
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_
+
+
+class Period(namedtuple("Period", ["start", "end"])):
+    """Half-open [start, end) range of dates"""
+    __slots__ = ()
+
+    @property
+    def start_month(self):
+        return self.start.strftime("%Y-%m")
+
+    @property
+    def end_month(self):
+        return self.end.strftime("%Y-%m")
+
+    def filter(self, column):
+        """SQL predicate selecting dates inside the period"""
+        return and_(column >= self.start, column < self.end)
+
+    def month_filter(self, column):
+        """SQL predicate selecting YYYY-MM keys inside a month-aligned period"""
+        return and_(column >= self.start_month, column < self.end_month)
+
+
+def _today(today=None):
+    if today is None:
+        return datetime.now().date()
+    if isinstance(today, datetime):
+        return today.date()
+    return today
+
+
+def _first_of_month(year, month):
+    """First day of a month, carrying month overflow into the year"""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def month_key(day=None):
+    """YYYY-MM key for a date (defaults to the current month)"""
+    return _today(day).strftime("%Y-%m")
+
+
+def shift_month(month, delta):
+    """Move a YYYY-MM key by delta months"""
+    year, mon = int(month[:4]), int(month[5:7])
+    return _first_of_month(year, mon + delta).strftime("%Y-%m")
+
+
+def month(month=None):
+    """Period covering one calendar month (YYYY-MM, defaults to the current month)"""
+    month = month or month_key()
+    year, mon = int(month[:4]), int(month[5:7])
+    return Period(_first_of_month(year, mon), _first_of_month(year, mon + 1))
+
+
+def year(year=None):
+    """Period covering one calendar year (defaults to the current year)"""
+    year = int(year or _today().year)
+    return Period(date(year, 1, 1), date(year + 1, 1, 1))
+
+
+def last_n_days(n, today=None):
+    """Period covering the last n days up to and including today"""
+    today = _today(today)
+    return Period(today - timedelta(days=n), today + timedelta(days=1))
+
+
+def last_n_months(n, today=None):
+    """Period covering the current calendar month and the n - 1 months before it"""
+    current = month_key(today)
+    return Period(month(shift_month(current, -(n - 1))).start, month(current).end)
+
+
+def parse_date(text):
+    """Parse a YYYY-MM-DD string, returning None if it is empty or invalid"""
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def between(start_date="", end_date=""):
+    """Period for inclusive start/end filter inputs; either bound may be empty"""
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    return Period(start, end + timedelta(days=1) if end else None)
+
+
+def criteria(column, period):
+    """List of SQL predicates for a period, skipping open bounds"""
+    conditions = []
+    if period.start is not None:
+        conditions.append(column >= period.start)
+    if period.end is not None:
+        conditions.append(column < period.end)
+    return conditions
+
+
+def apply(query, column, period):
+    """Filter a query to a period, skipping open bounds"""
+    return query.filter(*criteria(column, period))
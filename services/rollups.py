@@ -0,0 +1,190 @@
+"""
+Monthly rollup maintenance and queries
+Keeps MonthlyRollup in step with the expenses and income tables so that
+dashboard and report tiles read a few pre-aggregated rows per user
+"""
+
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Integer, func, type_coerce
+
+from migrations import ensure_schema
+from models import db, upsert, Expense, Income, MonthlyRollup, ORDINAL_EPOCH
+from money import Money, MoneyType
+from services import cache
+
+EXPENSE = "expense"
+INCOME = "income"
+
+
+def rollup_key(record):
+    """Return the (user_id, month, category, kind) rollup key for an Expense or Income row"""
+    month = str(record.date)[:7]
+    if isinstance(record, Expense):
+        return (record.user_id, month, record.category, EXPENSE)
+    return (record.user_id, month, record.source, INCOME)
+
+
+def track(record, sign=1):
+    """Add (sign=1) or remove (sign=-1) a single row from its monthly rollup"""
+    apply_deltas({rollup_key(record): [sign * record.amount, sign]})
+
+
+def deltas_for(model, mappings):
+    """Aggregate rollup deltas for column mappings about to be bulk inserted into model"""
+    deltas = defaultdict(lambda: [0, 0])
+    kind, category_key = (EXPENSE, "category") if model is Expense else (INCOME, "source")
+    for row in mappings:
+        bucket = deltas[(row["user_id"], str(row["date"])[:7], row[category_key], kind)]
+        bucket[0] += row["amount"]
+        bucket[1] += 1
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Upsert {key: [total_delta, count_delta]} into the rollup table in the current transaction"""
+    if not deltas:
+        return
+
+    table = MonthlyRollup.__table__
+    rows = [
+        {"user_id": user_id, "month": month, "category": category, "kind": kind, "total": total, "count": count}
+        for (user_id, month, category, kind), (total, count) in deltas.items()
+    ]
+
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.month, table.c.category, table.c.kind],
+        set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, rows)
+
+    # Drop buckets that no longer hold any rows so breakdowns stay clean
+    for user_id in {row["user_id"] for row in rows if row["count"] < 0}:
+        db.session.execute(table.delete().where(table.c.user_id == user_id, table.c.count <= 0))
+
+    cache.mark_dirty(*{row["user_id"] for row in rows})
+
+
+def total(user_id, kind, month=None, period=None):
+    """Sum a user's rollups for one kind, optionally for one month or a month-aligned period"""
+    query = db.session.query(func.sum(MonthlyRollup.total)).filter_by(user_id=user_id, kind=kind)
+    if month:
+        query = query.filter(MonthlyRollup.month == month)
+    if period:
+        query = query.filter(period.month_filter(MonthlyRollup.month))
+    return query.scalar() or Money(0)
+
+
+def count(user_id, kind, category=None):
+    """Number of raw rows behind a user's rollups, optionally for one category"""
+    query = db.session.query(func.sum(MonthlyRollup.count)).filter_by(user_id=user_id, kind=kind)
+    if category:
+        query = query.filter(MonthlyRollup.category == category)
+    return query.scalar() or 0
+
+
+def categories(user_id, kind=EXPENSE):
+    """Distinct categories a user has rows for"""
+    query = db.session.query(MonthlyRollup.category).filter_by(user_id=user_id, kind=kind).distinct()
+    return [row[0] for row in query.order_by(MonthlyRollup.category)]
+
+
+def category_totals(user_id, kind=EXPENSE, descending=False):
+    """Return [(category, total)] over a user's full history"""
+    query = db.session.query(MonthlyRollup.category, func.sum(MonthlyRollup.total)).filter_by(
+        user_id=user_id, kind=kind
+    ).group_by(MonthlyRollup.category)
+    if descending:
+        query = query.order_by(func.sum(MonthlyRollup.total).desc())
+    return query.all()
+
+
+def category_averages(user_id, period, kind=EXPENSE):
+    """Return [(category, average monthly total)] over the months of a period"""
+    return db.session.query(MonthlyRollup.category, func.avg(MonthlyRollup.total, type_=MoneyType)).filter_by(
+        user_id=user_id, kind=kind
+    ).filter(period.month_filter(MonthlyRollup.month)).group_by(MonthlyRollup.category).all()
+
+
+def month_expression(column):
+    """SQL expression for the YYYY-MM key of a DayNumber column"""
+    if db.engine.dialect.name == "sqlite":
+        return func.strftime("%Y-%m", type_coerce(column, Integer) + ORDINAL_EPOCH)
+    return func.to_char(column, "YYYY-MM")
+
+
+def expected_rollups(user_id=None):
+    """Recompute rollup buckets from the raw tables"""
+    expected = defaultdict(lambda: [0, 0])
+    sources = (
+        (Expense, Expense.category, EXPENSE),
+        (Income, Income.source, INCOME),
+    )
+    for model, category_col, kind in sources:
+        month_col = month_expression(model.date)
+        query = db.session.query(
+            model.user_id, month_col, category_col, func.sum(model.amount), func.count(model.id)
+        ).group_by(model.user_id, month_col, category_col)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        for uid, month, category, amount, count in query:
+            bucket = expected[(uid, month, category, kind)]
+            bucket[0] += amount or 0
+            bucket[1] += count
+    return expected
+
+
+def find_drift(expected, user_id=None):
+    """Compare stored rollups against expected buckets, returning [(key, stored, expected)]"""
+    query = MonthlyRollup.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    stored = {
+        (r.user_id, r.month, r.category, r.kind): [r.total, r.count]
+        for r in query
+        if r.count > 0
+    }
+
+    drift = []
+    for key in set(stored) | set(expected):
+        have = stored.get(key, [0, 0])
+        want = expected.get(key, [0, 0])
+        if have[1] != want[1] or have[0] != want[0]:
+            drift.append((key, have, want))
+    return sorted(drift)
+
+
+def rebuild(user_id=None):
+    """Replace stored rollups with values recomputed from the raw tables"""
+    expected = expected_rollups(user_id)
+    query = MonthlyRollup.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    query.delete(synchronize_session=False)
+    apply_deltas(expected)
+    db.session.commit()
+    return len(expected)
+
+
+@click.command("rebuild-rollups")
+@click.option("--user-id", type=int, default=None, help="Only rebuild rollups for this user")
+@click.option("--check", is_flag=True, help="Report drift without rewriting the table")
+@with_appcontext
+def rebuild_rollups_command(user_id, check):
+    """Backfill the monthly rollup table and check it for drift"""
+    ensure_schema(db.engine)
+    drift = find_drift(expected_rollups(user_id), user_id)
+    for (uid, month, category, kind), have, want in drift:
+        click.echo(f"drift user={uid} {month} {kind}:{category} stored={have[0]:.2f}/{have[1]} expected={want[0]:.2f}/{want[1]}")
+
+    if check:
+        click.echo(f"{len(drift)} drifted bucket(s)")
+        if drift:
+            raise SystemExit(1)
+        return
+
+    count = rebuild(user_id)
+    click.echo(f"Rebuilt {count} rollup bucket(s), fixed {len(drift)} drifted bucket(s)")
@@ -0,0 +1,73 @@
+"""
+Session storage backends
+SESSION_BACKEND picks where sessions live:
+  cookie      - Flask's signed cookie; no server I/O (default when SECRET_KEY is set)
+  sqlalchemy  - rows in the app database with an indexed expiry, pruned in bulk (default otherwise)
+  filesystem  - Flask-Session's file store (single instance only)
+Sessions only carry user_id, the CSRF secret and flash messages, so the signed
+cookie stays well under browser limits. Whoever knows SECRET_KEY can sign a
+cookie for any user_id, so the cookie store refuses to start without a key of
+its own.
+"""
+
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete
+
+from migrations import ensure_schema
+from models import db, ServerSession
+
+BACKENDS = ("cookie", "sqlalchemy", "filesystem")
+
+# The app's fallback key and the placeholder from render.yaml; both are public
+INSECURE_SECRET_KEYS = {"dev-key-change-in-production", "your-secret-key-here-change-in-production"}
+
+
+def has_secure_secret_key(secret_key):
+    """True if secret_key is set and not one of the published placeholders"""
+    return bool(secret_key) and secret_key not in INSECURE_SECRET_KEYS
+
+
+def prune_sessions():
+    """Delete every expired session row in one statement, returning how many were removed"""
+    with db.engine.begin() as conn:
+        return conn.execute(delete(ServerSession).where(ServerSession.expiry <= datetime.utcnow())).rowcount
+
+
+def init_app(app):
+    """Install the session interface selected by SESSION_BACKEND"""
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    if backend == "cookie":
+        # Flask's built-in SecureCookieSessionInterface, signed with SECRET_KEY
+        if not has_secure_secret_key(app.secret_key):
+            raise RuntimeError(
+                "SESSION_BACKEND=cookie signs sessions with SECRET_KEY, which is missing or a published default. "
+                "Set SECRET_KEY to a random value (python -c \"import secrets; print(secrets.token_hex(32))\") "
+                "or use SESSION_BACKEND=sqlalchemy."
+            )
+        return
+    if backend == "filesystem":
+        from flask_session import Session
+        app.config["SESSION_TYPE"] = "filesystem"
+        Session(app)
+        return
+
+    # The sessions table is created by the migrations with the other models
+    from services.sql_sessions import SqlSessionInterface
+    app.session_interface = SqlSessionInterface(
+        app,
+        prune_every=app.config.get("SESSION_PRUNE_EVERY", 1000),
+        permanent=app.config["SESSION_PERMANENT"],
+    )
+
+
+@click.command("prune-sessions")
+@with_appcontext
+def prune_sessions_command():
+    """Delete expired server-side sessions (for SESSION_BACKEND=sqlalchemy)"""
+    ensure_schema(db.engine)
+    click.echo(f"Pruned {prune_sessions()} expired session(s)")
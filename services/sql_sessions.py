@@ -0,0 +1,83 @@
+"""
+Server-side session store in the app database
+Kept apart from services.sessions so the cookie backend never imports
+Flask-Session; services.sessions.init_app imports it only for
+SESSION_BACKEND=sqlalchemy. The interface overrides private storage hooks of
+Flask-Session 0.8, which is why requirements.txt pins that release series.
+"""
+
+import random
+from datetime import datetime
+
+from flask import g
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from sqlalchemy import delete, select
+
+from models import db, upsert, ServerSession
+from services.sessions import prune_sessions
+
+
+class SqlSessionInterface(ServerSideSessionInterface):
+    """Server-side sessions in the ServerSession table
+
+    Each operation runs in its own short transaction on the engine, so session
+    writes never commit or roll back the request's ORM session. Unmodified
+    sessions are only re-saved once half their lifetime has passed.
+    """
+
+    session_class = ServerSideSession
+    ttl = False
+
+    def __init__(self, app, prune_every=1000, **kwargs):
+        super().__init__(app, cleanup_n_requests=None, **kwargs)
+        self.prune_every = prune_every
+        if prune_every:
+            app.before_request(self._maybe_prune)
+
+    def _maybe_prune(self):
+        if random.randrange(self.prune_every) == 0:
+            self._delete_expired_sessions()
+
+    def _register_cleanup_app_command(self):
+        # Replaced by the prune-sessions command registered in create_app
+        pass
+
+    def _retrieve_session_data(self, store_id):
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(ServerSession.data, ServerSession.expiry).where(ServerSession.session_id == store_id)
+            ).first()
+        if row is None or row.expiry <= datetime.utcnow():
+            return None
+        g.session_expiry = row.expiry
+        return self.serializer.decode(row.data)
+
+    def _delete_session(self, store_id):
+        with db.engine.begin() as conn:
+            conn.execute(delete(ServerSession).where(ServerSession.session_id == store_id))
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        table = ServerSession.__table__
+        values = {
+            "session_id": store_id,
+            "data": self.serializer.encode(session),
+            "expiry": datetime.utcnow() + session_lifetime,
+        }
+        stmt = upsert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.session_id],
+            set_={"data": stmt.excluded.data, "expiry": stmt.excluded.expiry}
+        )
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def _delete_expired_sessions(self):
+        return prune_sessions()
+
+    def should_set_storage(self, app, session):
+        if session.modified:
+            return True
+        if not app.config["SESSION_REFRESH_EACH_REQUEST"]:
+            return False
+        expiry = g.get("session_expiry")
+        return expiry is None or expiry - datetime.utcnow() < app.permanent_session_lifetime / 2
@@ -0,0 +1,111 @@
+"""
+Per-request SQL instrumentation
+With SQL_TIMING on, engine events time every statement. Each request gets a
+query count, total database time and its slowest statements, reported in a
+Server-Timing header that browser dev tools show next to the request.
+Statements slower than SQL_SLOW_QUERY_MS also go to a rotating slow-query
+log. With it off no listener is installed, so queries pay nothing.
+"""
+
+import heapq
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+slow_log = logging.getLogger("expense_tracker.slow_queries")
+
+
+class QueryStats:
+    """Query count, total time and the slowest statements of one request"""
+
+    def __init__(self, top_n):
+        self.top_n = top_n
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []  # min-heap of (seconds, statement), at most top_n long
+
+    def add(self, elapsed, statement):
+        self.count += 1
+        self.total += elapsed
+        if self.top_n:
+            item = (elapsed, statement)
+            if len(self.slowest) < self.top_n:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def server_timing(self):
+        """Server-Timing header value: the total, then each of the slowest statements"""
+        metrics = [f'db;dur={self.total * 1000:.2f};desc="{self.count} queries"']
+        for rank, (elapsed, statement) in enumerate(sorted(self.slowest, reverse=True), 1):
+            metrics.append(f'sql{rank};dur={elapsed * 1000:.2f};desc="{_describe(statement)}"')
+        return ", ".join(metrics)
+
+
+def _describe(statement, limit=80):
+    """One-line statement prefix that is safe inside a quoted header parameter"""
+    text = " ".join(statement.split()).replace("\\", "").replace('"', "'")
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _install_listeners(engine, slow_seconds):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_start"].pop()
+        path = None
+        if has_request_context():
+            path = request.path
+            stats = g.get("query_stats")
+            if stats is not None:
+                stats.add(elapsed, statement)
+        if elapsed >= slow_seconds:
+            slow_log.warning("%.1f ms %s %s", elapsed * 1000, path or "-", " ".join(statement.split()))
+
+
+def _slow_log_handler(app):
+    path = app.config.get("SQL_SLOW_QUERY_LOG") or os.path.join(app.instance_path, "slow_queries.log")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(
+        path, maxBytes=app.config.get("SQL_SLOW_QUERY_LOG_BYTES", 5 * 1024 * 1024),
+        backupCount=app.config.get("SQL_SLOW_QUERY_LOG_BACKUPS", 3),
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(process)d %(message)s"))
+    return handler
+
+
+def init_app(app):
+    """Time SQL statements per request if SQL_TIMING is set"""
+    if not app.config.get("SQL_TIMING"):
+        return
+
+    if not slow_log.handlers:
+        slow_log.addHandler(_slow_log_handler(app))
+        slow_log.setLevel(logging.WARNING)
+        slow_log.propagate = False
+    with app.app_context():
+        _install_listeners(db.engine, app.config.get("SQL_SLOW_QUERY_MS", 100) / 1000)
+
+    top_n = app.config.get("SQL_TIMING_TOP_N", 3)
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats(top_n)
+
+    @app.after_request
+    def _add_server_timing(response):
+        stats = g.get("query_stats")
+        if stats is not None:
+            response.headers.add("Server-Timing", stats.server_timing())
+        return response
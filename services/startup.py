@@ -0,0 +1,89 @@
+"""
+Cold start report
+Measures, in fresh interpreters, how long `import app` takes (broken down by
+module with python -X importtime) and how long create_app() takes after that,
+so slow imports or startup work show up before they reach a deploy.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+_CREATE_APP_TIMER = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (done - imported) * 1000}))
+"""
+
+
+def _run(args, root):
+    env = dict(os.environ, STORAGE_STARTUP_REPORT="0")
+    return subprocess.run([sys.executable, *args], cwd=root, env=env, capture_output=True, text=True, check=True)
+
+
+def import_times(root):
+    """[(module, self_ms, cumulative_ms)] for `import app`, from python -X importtime"""
+    output = _run(["-X", "importtime", "-c", "import app"], root).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return modules
+
+
+def startup_times(root, runs=3):
+    """Best-of-runs import and create_app() wall times in milliseconds"""
+    samples = [json.loads(_run(["-c", _CREATE_APP_TIMER], root).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    return {key: round(min(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def top_level_imports(modules, limit):
+    """Slowest packages by cumulative time, counting each top-level package once"""
+    totals = {}
+    for name, _, cumulative in modules:
+        package = name.split(".")[0]
+        totals[package] = max(totals.get(package, 0), cumulative)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+@click.command("startup-report")
+@click.option("--top", default=15, help="Number of slowest packages to list")
+@click.option("--runs", default=3, help="create_app() timings to take the best of")
+@click.option("--max-import-ms", type=float, default=None, help="Fail if importing app takes longer")
+@click.option("--max-startup-ms", type=float, default=None, help="Fail if create_app() takes longer")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON")
+@with_appcontext
+def startup_report_command(top, runs, max_import_ms, max_startup_ms, as_json):
+    """Report import time and create_app() time in fresh interpreters"""
+    root = current_app.root_path
+    modules = import_times(root)
+    timings = startup_times(root, runs)
+    slowest = top_level_imports(modules, top)
+
+    if as_json:
+        click.echo(json.dumps({**timings, "slowest_imports_ms": dict(slowest)}, indent=2))
+    else:
+        click.echo(f"import app:   {timings['import_ms']:.1f} ms")
+        click.echo(f"create_app(): {timings['create_app_ms']:.1f} ms")
+        click.echo("slowest imports (cumulative ms):")
+        for package, cumulative in slowest:
+            click.echo(f"  {cumulative:8.1f}  {package}")
+
+    failures = []
+    if max_import_ms is not None and timings["import_ms"] > max_import_ms:
+        failures.append(f"import took {timings['import_ms']:.1f} ms (limit {max_import_ms:.0f} ms)")
+    if max_startup_ms is not None and timings["create_app_ms"] > max_startup_ms:
+        failures.append(f"create_app() took {timings['create_app_ms']:.1f} ms (limit {max_startup_ms:.0f} ms)")
+    if failures:
+        raise click.ClickException("; ".join(failures))
@@ -0,0 +1,120 @@
+"""
+SQLite storage profile
+Every new SQLite connection gets the pragmas of the configured profile. The
+production profile runs in WAL mode so readers never block the writer, waits
+on a busy database instead of failing with "database is locked", and gives
+each connection a memory-mapped, larger page cache. Pool sizing follows the
+number of threads per gunicorn worker.
+"""
+
+import os
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, text
+
+from models import db
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, no busy timeout
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # ms
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative means KiB, i.e. 64 MiB
+        "temp_store": "MEMORY",
+    },
+}
+
+REPORTED_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store")
+
+
+def profile_pragmas(name, overrides=None):
+    """Pragmas for a named profile, with per-pragma overrides (None removes one)"""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {name}")
+    pragmas = dict(PROFILES[name])
+    for pragma, value in (overrides or {}).items():
+        if value is None:
+            pragmas.pop(pragma, None)
+        else:
+            pragmas[pragma] = value
+    return pragmas
+
+
+def env_overrides():
+    """SQLITE_<PRAGMA> environment variables, e.g. SQLITE_BUSY_TIMEOUT=10000"""
+    overrides = {}
+    for pragma in REPORTED_PRAGMAS:
+        value = os.getenv(f"SQLITE_{pragma.upper()}")
+        if value:
+            overrides[pragma] = value
+    return overrides
+
+
+def engine_options(database_url, threads=1):
+    """SQLALCHEMY_ENGINE_OPTIONS suited to the database and the threads per worker"""
+    if not database_url.startswith("sqlite"):
+        return {"pool_pre_ping": True}
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        return {}
+    # One connection per request thread plus one for a server-side session store
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", threads + 1)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", threads)),
+        "pool_timeout": 10,
+    }
+
+
+def install_pragmas(engine, pragmas):
+    """Run the pragmas on every new DBAPI connection of a SQLite engine"""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+        finally:
+            cursor.close()
+
+
+def effective_settings(engine):
+    """Pragma values as SQLite reports them, plus the pool configuration"""
+    settings = {}
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            for pragma in REPORTED_PRAGMAS:
+                settings[pragma] = conn.execute(text(f"PRAGMA {pragma}")).scalar()
+    pool = engine.pool
+    settings["pool"] = type(pool).__name__
+    if hasattr(pool, "size"):
+        settings["pool_size"] = pool.size()
+        settings["max_overflow"] = getattr(pool, "_max_overflow", None)
+    return settings
+
+
+def format_settings(settings):
+    return ", ".join(f"{key}={value}" for key, value in settings.items())
+
+
+def init_app(app):
+    """Install the SQLITE_PROFILE pragmas on the app's engine"""
+    pragmas = profile_pragmas(app.config.get("SQLITE_PROFILE", "production"), app.config.get("SQLITE_PRAGMAS"))
+    with app.app_context():
+        install_pragmas(db.engine, pragmas)
+        if app.config.get("STORAGE_STARTUP_REPORT"):
+            app.logger.info("storage %s: %s", db.engine.url.render_as_string(), format_settings(effective_settings(db.engine)))
+
+
+@click.command("storage-info")
+@with_appcontext
+def storage_info_command():
+    """Show the effective SQLite pragmas and connection pool settings"""
+    click.echo(f"database: {db.engine.url.render_as_string()}")
+    for key, value in effective_settings(db.engine).items():
+        click.echo(f"{key}: {value}")
@@ -0,0 +1,49 @@
+"""
+Monthly income vs expense trend series for the dashboard chart
+Completed months are computed with one grouped query over the rollup table for
+a bounded month range, filled to a dense month axis and kept in the read
+cache; the current month comes from the dashboard's own totals
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func
+
+from models import db, MonthlyRollup
+from services import cache, periods, rollups
+
+TREND_WINDOWS = (6, 12, 24)
+
+
+def _label(month):
+    return datetime.strptime(month, "%Y-%m").strftime("%b %Y")
+
+
+def _past_months(user_id, window, current_month):
+    """Dense series for the window - 1 months before the current one"""
+    months = [periods.shift_month(current_month, offset) for offset in range(-(window - 1), 0)]
+    totals = {}
+    if months:
+        period = periods.Period(periods.month(months[0]).start, periods.month(current_month).start)
+        rows = db.session.query(
+            MonthlyRollup.month, MonthlyRollup.kind, func.sum(MonthlyRollup.total)
+        ).filter(
+            MonthlyRollup.user_id == user_id,
+            period.month_filter(MonthlyRollup.month)
+        ).group_by(MonthlyRollup.month, MonthlyRollup.kind).all()
+        totals = {(month, kind): amount for month, kind, amount in rows}
+
+    return (
+        [_label(month) for month in months],
+        [float(totals.get((month, rollups.INCOME)) or 0) for month in months],
+        [float(totals.get((month, rollups.EXPENSE)) or 0) for month in months],
+    )
+
+
+def trend_series(user_id, window, income_month, expenses_month, current_month=None):
+    """Return (labels, income, expenses) for the last `window` months ending with the current one"""
+    current_month = current_month or periods.month_key()
+    labels, income, expenses = cache.cached(
+        user_id, f"trend:{window}", current_month, lambda: _past_months(user_id, window, current_month)
+    )
+    return labels + [_label(current_month)], income + [float(income_month)], expenses + [float(expenses_month)]
@@ -0,0 +1,144 @@
+"""
+Write coalescing
+With WRITE_COALESCING on, request threads hand their write jobs to a single
+writer thread per process instead of committing themselves. The writer takes
+whatever has queued up (at most WRITE_MAX_BATCH jobs, waiting no longer than
+WRITE_MAX_DELAY_MS for more), runs each job in its own savepoint and commits
+the group once, so many small writes share one lock acquisition and one WAL
+commit. Every caller gets its own result or exception back through a future.
+With it off, jobs run inline and commit immediately.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+
+from models import db
+
+
+class WriteQueueBusy(RuntimeError):
+    """A queued write did not finish within WRITE_TIMEOUT"""
+
+
+class WriteQueue:
+    """Queue of write jobs drained by one writer thread"""
+
+    def __init__(self, app, max_batch=64, max_delay=0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return a Future for its result"""
+        self._ensure_writer()
+        future = Future()
+        self._jobs.put((fn, args, kwargs, future))
+        return future
+
+    def _ensure_writer(self):
+        # Started lazily, and again after a fork, so every gunicorn worker gets its own writer
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Block for one job, then gather more until the batch is full or the delay runs out"""
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            with self.app.app_context():
+                self._commit(batch)
+
+    def _commit(self, batch):
+        """Run a batch of jobs in savepoints of one transaction and resolve their futures"""
+        outcomes = []
+        try:
+            if db.engine.dialect.name == "sqlite":
+                # Take the write lock up front; without an explicit BEGIN, releasing the
+                # first savepoint would commit on its own
+                db.session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for fn, args, kwargs, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.session.begin_nested():
+                        outcomes.append((future, fn(*args, **kwargs), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for *_, future in batch:
+                if not future.done() and (future.running() or future.set_running_or_notify_cancel()):
+                    future.set_exception(e)
+            return
+        finally:
+            db.session.remove()
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def init_app(app):
+    """Start write coalescing if WRITE_COALESCING is set"""
+    if app.config.get("WRITE_COALESCING"):
+        app.extensions["write_queue"] = WriteQueue(
+            app,
+            max_batch=app.config.get("WRITE_MAX_BATCH", 64),
+            max_delay=app.config.get("WRITE_MAX_DELAY_MS", 5) / 1000,
+        )
+
+
+def run(fn, *args, **kwargs):
+    """Run a write job and commit it, through the writer thread when coalescing is on
+
+    The job must only use its arguments and db.session, since it may run on
+    another thread. Its exception, if any, is re-raised here. On timeout
+    WriteQueueBusy is raised, and the job may still commit later.
+    """
+    write_queue = current_app.extensions.get("write_queue")
+    if write_queue is None:
+        try:
+            result = fn(*args, **kwargs)
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+    timeout = current_app.config.get("WRITE_TIMEOUT", 10)
+    future = write_queue.submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if future.done():  # the job's own TimeoutError
+            raise
+        # Routes flash the exception text, and a bare TimeoutError has none
+        raise WriteQueueBusy(
+            f"Write queue busy: the change was not confirmed within {timeout:g} s and may still be saved. "
+            "Check before retrying."
+        ) from None
@@ -0,0 +1,82 @@
+"""
+Shared fixtures: an app on a throwaway SQLite file and a logged-in client
+for a user with a few months of expenses, income and budgets
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EXPENSE_CATEGORIES = ["Food", "Transport", "Utilities", "Entertainment", "Healthcare", "Shopping", "Other"]
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("SECRET_KEY", "test-secret-key")
+    monkeypatch.setenv("STORAGE_STARTUP_REPORT", "0")
+    monkeypatch.setenv("READ_CACHE_BACKEND", "none")
+    monkeypatch.setenv("PDF_REPORT_DIR", str(tmp_path / "reports"))
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    app.config["TESTING"] = True
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def make_user(app, username="alice", expenses=60, budget_categories=EXPENSE_CATEGORIES):
+    """Create a user with expenses and income spread over recent months and this month's budgets"""
+    from sqlalchemy import insert
+
+    from models import db, Expense, Income, User
+    from money import Money
+    from services import budgets, periods, rollups
+
+    today = date.today()
+    with app.app_context():
+        user = User(username=username, email=f"{username}@example.com", hash="unused")
+        db.session.add(user)
+        db.session.commit()
+        db.session.execute(insert(Expense), [
+            {"user_id": user.id, "amount": Money(10 + n), "category": EXPENSE_CATEGORIES[n % len(EXPENSE_CATEGORIES)],
+             "date": today - timedelta(days=n * 3), "note": f"note {n}"}
+            for n in range(expenses)
+        ])
+        db.session.execute(insert(Income), [
+            {"user_id": user.id, "amount": Money(2500), "source": "Salary", "date": today - timedelta(days=n * 30)}
+            for n in range(6)
+        ])
+        budgets.save_budgets(user.id, periods.month_key(), {category: Money(100) for category in budget_categories})
+        db.session.commit()
+        rollups.rebuild(user.id)
+        return user.id
+
+
+@pytest.fixture
+def query_budget():
+    """assert_query_budget(client, path, max_queries, max_repeats=None, method="GET", **kwargs)"""
+    from services.n_plus_one import assert_query_budget
+
+    return assert_query_budget
+
+
+@pytest.fixture
+def user_id(app):
+    return make_user(app)
+
+
+@pytest.fixture
+def client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
@@ -0,0 +1,80 @@
+"""
+Multi-row adds: the valid rows commit together in one INSERT, the invalid
+ones come back numbered, and only the first MAX_REPORTED_ERRORS are listed
+"""
+
+from datetime import date
+
+from flask import get_flashed_messages
+from sqlalchemy import event
+
+from models import db, Expense
+from services import batch
+from services.n_plus_one import count_queries
+
+TODAY = date.today().isoformat()
+
+
+def row(amount="10.00", category="Food", day=TODAY, note=""):
+    return {"amount": amount, "category": category, "date": day, "note": note}
+
+
+def form(rows):
+    """The multi-row add form for rows"""
+    return {f"{key}[]": [r[key] for r in rows] for key in ("amount", "category", "date", "note")}
+
+
+def expense_count(app, user_id):
+    with app.app_context():
+        return db.session.query(Expense).filter_by(user_id=user_id).count()
+
+
+def test_valid_rows_commit_together_and_bad_rows_are_numbered(app, user_id):
+    before = expense_count(app, user_id)
+    rows = [row(), row(amount="abc"), row(category="Rent"), row(day="2024-13-01"), row(amount="2.50")]
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    with app.app_context(), count_queries() as statements:
+        event.listen(db.engine, "commit", on_commit)
+        try:
+            result = batch.ingest(Expense, user_id, rows)
+        finally:
+            event.remove(db.engine, "commit", on_commit)
+
+    assert result.inserted == 2
+    assert result.rejected == 3
+    assert [number for number, _ in result.errors] == [2, 3, 4]
+    assert result.errors[0][1].startswith("Invalid amount")
+    assert len(commits) == 1
+    assert sum(statement.startswith("INSERT INTO expenses") for statement in statements) == 1
+    assert expense_count(app, user_id) == before + 2
+
+
+def test_route_flashes_row_numbers(app, client):
+    rows = [row(), row(amount="-5"), row()]
+    data = form(rows)
+    with client:
+        client.post("/expenses/add_expense", data=data)
+        messages = get_flashed_messages()
+    assert any(message.startswith("Row 2: ") for message in messages)
+    assert "2 expense(s) added successfully!" in messages
+
+
+def test_error_list_is_capped(app, client, user_id):
+    rows = [row(amount="bad")] * 120 + [row()]
+    with app.app_context():
+        result = batch.ingest(Expense, user_id, rows)
+    assert result.inserted == 1
+    assert result.rejected == 120
+    assert len(result.errors) == batch.MAX_REPORTED_ERRORS
+    assert [number for number, _ in result.errors] == list(range(1, batch.MAX_REPORTED_ERRORS + 1))
+
+    data = form(rows)
+    with client:
+        client.post("/expenses/add_expense", data=data)
+        messages = get_flashed_messages()
+    assert sum(message.startswith("Row ") for message in messages) == batch.MAX_REPORTED_ERRORS
+    assert "70 more invalid row(s) not shown." in messages
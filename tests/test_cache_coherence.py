@@ -0,0 +1,63 @@
+"""
+Two app instances on one database stand in for two workers: a write through
+one must invalidate the other's cached views and ETags through DataVersion
+"""
+
+from datetime import date
+
+import pytest
+
+from services import cache
+
+
+@pytest.fixture
+def worker_b(app, monkeypatch):
+    from app import create_app
+    from models import db
+
+    monkeypatch.setenv("READ_CACHE_BACKEND", "memory")
+    app.config["READ_CACHE_BACKEND"] = "memory"
+    cache.init_app(app)
+
+    other = create_app()
+    yield other
+    with other.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def login(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
+
+
+def test_write_on_one_worker_invalidates_the_other(app, worker_b, user_id, monkeypatch):
+    import blueprints.main
+    from services.dashboard import load_dashboard
+
+    computed = []
+
+    def counting(user_id, month):
+        data = load_dashboard(user_id, month)
+        computed.append(data.balance)
+        return data
+
+    monkeypatch.setattr(blueprints.main, "load_dashboard", counting)
+    client_a, client_b = login(app, user_id), login(worker_b, user_id)
+
+    client_b.get("/dashboard")
+    client_b.get("/dashboard")
+    assert len(computed) == 1
+    etag = client_b.get("/reports").headers["ETag"]
+    assert client_b.get("/reports", headers={"If-None-Match": etag}).status_code == 304
+
+    data = {"amount[]": "40.00", "category[]": "Food", "date[]": date.today().isoformat(), "note[]": ""}
+    assert client_a.post("/expenses/add_expense", data=data).status_code == 302
+
+    client_b.get("/dashboard")
+    assert len(computed) == 2 and computed[1] == computed[0] - 40
+    response = client_b.get("/reports", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
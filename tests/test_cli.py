@@ -0,0 +1,19 @@
+import pytest
+
+from migrations import SCHEMA_VERSION, stored_schema_version
+from models import db
+
+
+@pytest.mark.parametrize("command", ["rebuild-rollups", "prune-sessions"])
+def test_maintenance_commands_migrate_a_fresh_database(tmp_path, monkeypatch, command):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'fresh.db'}")
+    monkeypatch.setenv("SCHEMA_CHECK", "0")
+
+    from app import create_app
+
+    app = create_app()
+    result = app.test_cli_runner().invoke(args=[command])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert stored_schema_version(db.engine) == SCHEMA_VERSION
+        db.engine.dispose()
@@ -0,0 +1,95 @@
+"""
+Conditional GET: pages behind services.etag.conditional answer a matching
+If-None-Match with 304 before the view runs, and any write, filter change
+or pending flash gives a fresh page
+"""
+
+from datetime import date
+
+import pytest
+from flask import template_rendered
+
+from services.n_plus_one import count_queries
+
+PAGES = ["/expenses/expense_history", "/income/income_history", "/reports", "/budgets"]
+JSON_ROUTES = ["/get_budgets", "/get_budget_suggestions"]
+
+TODAY = date.today().isoformat()
+WRITES = {
+    "expense": ("/expenses/add_expense", {"amount[]": "12.50", "category[]": "Food", "date[]": TODAY, "note[]": ""}),
+    "income": ("/income/add_income", {"amount": "100", "date": TODAY, "source": "Salary"}),
+    "budget": ("/set_budget", {"category": "Food", "budget_limit": "999"}),
+}
+
+
+def etag_of(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    return response.headers["ETag"]
+
+
+@pytest.mark.parametrize("path", PAGES + JSON_ROUTES)
+def test_repeated_get_is_not_modified_without_running_the_view(app, client, path):
+    etag = etag_of(client, path)
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    template_rendered.connect(record, app)
+    try:
+        with app.app_context(), count_queries() as statements:
+            response = client.get(path, headers={"If-None-Match": etag})
+    finally:
+        template_rendered.disconnect(record, app)
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert rendered == []
+    assert len(statements) <= 1  # the user's data version, nothing the view would run
+
+
+@pytest.mark.parametrize("write", sorted(WRITES))
+def test_writes_change_the_etag(client, write):
+    before = {path: etag_of(client, path) for path in PAGES + JSON_ROUTES}
+
+    path, data = WRITES[write]
+    assert client.post(path, data=data, follow_redirects=True).status_code == 200
+
+    for page, etag in before.items():
+        response = client.get(page, headers={"If-None-Match": etag})
+        assert response.status_code == 200, page
+        assert response.headers["ETag"] != etag
+
+
+def test_filters_give_different_etags(client):
+    plain = etag_of(client, "/expenses/expense_history")
+    filtered = etag_of(client, "/expenses/expense_history?category=Food")
+    dated = etag_of(client, "/expenses/expense_history?category=Food&start_date=2000-01-01")
+    assert len({plain, filtered, dated}) == 3
+
+    response = client.get("/expenses/expense_history?category=Transport", headers={"If-None-Match": filtered})
+    assert response.status_code == 200
+
+
+def test_pending_flash_skips_the_304(client):
+    etag = etag_of(client, "/expenses/expense_history")
+    with client.session_transaction() as session:
+        session["_flashes"] = [("message", "Saved")]
+
+    response = client.get("/expenses/expense_history", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Saved" in response.get_data(as_text=True)
+
+    # Once the flash has been shown the page can come from cache again
+    assert client.get("/expenses/expense_history", headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.parametrize("path", JSON_ROUTES)
+def test_json_routes_are_conditional(client, path):
+    response = client.get(path)
+    assert response.is_json
+    assert response.headers.get("ETag")
+    assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
@@ -0,0 +1,19 @@
+from datetime import date
+
+from models import db, Expense
+from money import Money
+
+
+def test_csv_cells_are_not_formulas(app, client, user_id):
+    with app.app_context():
+        for note in ["=HYPERLINK(\"http://example.com\")", "+1", "-1", "@SUM(A1)"]:
+            db.session.add(Expense(user_id=user_id, amount=Money(1), category="Other", date=date(2000, 1, 1), note=note))
+        db.session.commit()
+
+    lines = client.get("/expenses/export.csv?start_date=2000-01-01&end_date=2000-01-01").get_data(as_text=True).splitlines()
+    assert lines[1:] == [
+        "2000-01-01,1.00,Other,'@SUM(A1)",
+        "2000-01-01,1.00,Other,'-1",
+        "2000-01-01,1.00,Other,'+1",
+        "2000-01-01,1.00,Other,\"'=HYPERLINK(\"\"http://example.com\"\")\"",
+    ]
@@ -0,0 +1,50 @@
+import io
+import threading
+
+from models import db, Expense
+from services import batch, writes
+
+
+def upload(client, content):
+    return client.post("/expenses/import_csv", data={"file": (io.BytesIO(content), "expenses.csv")},
+                       content_type="multipart/form-data", follow_redirects=True)
+
+
+def test_small_upload_is_imported(app, client, user_id):
+    response = upload(client, b"date,amount,category\n2024-01-31,12.50,Food\n")
+    assert "Imported 1 expense row(s)" in response.get_data(as_text=True)
+
+
+def test_large_upload_is_refused(app, client, user_id):
+    app.config["IMPORT_MAX_UPLOAD_BYTES"] = 1024
+    with app.app_context():
+        before = db.session.query(Expense).count()
+
+    rows = b"".join(b"2024-01-31,12.50,Food\n" for _ in range(100))
+    page = upload(client, b"date,amount,category\n" + rows).get_data(as_text=True)
+    assert "too large to import here" in page
+    assert "flask import-csv" in page
+    with app.app_context():
+        assert db.session.query(Expense).count() == before
+
+
+def test_chunks_go_through_the_write_queue(app, client, user_id, monkeypatch):
+    app.config.update(WRITE_COALESCING=True, IMPORT_CHUNK_SIZE=2)
+    writes.init_app(app)
+    threads = []
+    insert_mappings = batch.insert_mappings
+
+    def recording_insert(model, mappings):
+        threads.append(threading.current_thread().name)
+        return insert_mappings(model, mappings)
+
+    monkeypatch.setattr(batch, "insert_mappings", recording_insert)
+    with app.app_context():
+        before = db.session.query(Expense).count()
+
+    rows = b"".join(b"2024-01-31,12.50,Food\n" for _ in range(5))
+    page = upload(client, b"date,amount,category\n" + rows).get_data(as_text=True)
+    assert "Imported 5 expense row(s), 0 rejected." in page
+    assert threads == ["write-coalescer"] * 3
+    with app.app_context():
+        assert db.session.query(Expense).count() == before + 5
@@ -0,0 +1,187 @@
+"""
+Upgrading a database created by the original init_db.py: REAL dollar amounts
+and TEXT dates become integer cents and day numbers
+"""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from migrations import SCHEMA_VERSION, stored_schema_version
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, email TEXT UNIQUE NOT NULL,
+    hash TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE income (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, amount REAL NOT NULL, date TEXT NOT NULL,
+    source TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, amount REAL NOT NULL, category TEXT NOT NULL,
+    date TEXT NOT NULL, note TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE budgets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, category TEXT NOT NULL,
+    budget_limit REAL NOT NULL, month TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(user_id, category, month)
+);
+CREATE INDEX idx_expenses_user_id ON expenses(user_id);
+CREATE INDEX idx_expenses_date ON expenses(date);
+CREATE INDEX idx_budgets_user_id ON budgets(user_id);
+"""
+
+LEGACY_EXPENSES = [(19.99, "Food", "2024-01-31"), (0.1, "Food", "2024-02-01"), (1234.56, "Shopping", "2024-02-29")]
+LEGACY_INCOME = [(2500.5, "2024-01-15", "Salary")]
+LEGACY_BUDGETS = [("Food", 300.0, "2024-02")]
+
+
+def create_legacy_database(path, expenses=LEGACY_EXPENSES):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO users (username, email, hash) VALUES ('old', 'old@example.com', 'x')")
+    conn.executemany("INSERT INTO expenses (user_id, amount, category, date) VALUES (1, ?, ?, ?)", expenses)
+    conn.executemany("INSERT INTO income (user_id, amount, date, source) VALUES (1, ?, ?, ?)", LEGACY_INCOME)
+    conn.executemany("INSERT INTO budgets (user_id, category, budget_limit, month) VALUES (1, ?, ?, ?)", LEGACY_BUDGETS)
+    conn.commit()
+    conn.close()
+
+
+def start_app(path, monkeypatch):
+    """Start the app on an existing database, which migrates it"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setenv("SECRET_KEY", "test-secret-key")
+    monkeypatch.setenv("READ_CACHE_BACKEND", "none")
+
+    from app import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    path = tmp_path / "legacy.db"
+    create_legacy_database(path)
+    return path
+
+
+@pytest.fixture
+def legacy_app(legacy_path, monkeypatch):
+    from models import db
+
+    app = start_app(legacy_path, monkeypatch)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def column_types(app, table):
+    from models import db
+
+    with app.app_context():
+        return {row[1]: row[2] for row in db.session.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def test_money_columns_become_integer_cents(legacy_app):
+    from models import db, Budget, Expense, Income
+    from money import Money
+
+    for table, column in [("expenses", "amount"), ("income", "amount"), ("budgets", "budget_limit")]:
+        assert column_types(legacy_app, table)[column] == "INTEGER"
+
+    with legacy_app.app_context():
+        assert stored_schema_version(db.engine) == SCHEMA_VERSION
+        raw = db.session.execute(text("SELECT amount FROM expenses ORDER BY id")).scalars().all()
+        assert raw == [1999, 10, 123456]
+        assert [e.amount for e in Expense.query.order_by(Expense.id)] == [Money("19.99"), Money("0.10"), Money("1234.56")]
+        assert Income.query.one().amount == Money("2500.50")
+        assert Budget.query.one().budget_limit == Money("300.00")
+
+
+def test_rollups_are_backfilled_in_cents(legacy_app):
+    from models import db
+    from services import rollups
+
+    with legacy_app.app_context():
+        assert rollups.find_drift(rollups.expected_rollups()) == []
+        assert db.session.execute(text("SELECT SUM(total) FROM monthly_rollups WHERE kind = 'expense'")).scalar() == 1999 + 10 + 123456
+
+
+MALFORMED_EXPENSES = [
+    ("2024-03-05 12:30:00", "2024-03-05"),  # a timestamp keeps its day
+    ("2024-02-30", "2023-12-25"),  # everything else falls back to the creation day
+    ("31/01/2024", "2023-12-25"),
+    ("not a date", "2023-12-25"),
+]
+
+
+@pytest.fixture
+def malformed_app(legacy_path, monkeypatch):
+    from models import db
+
+    conn = sqlite3.connect(legacy_path)
+    conn.executemany(
+        "INSERT INTO expenses (user_id, amount, category, date, note, created_at) "
+        "VALUES (1, 1, 'Other', ?, 'malformed', '2023-12-25 08:00:00')",
+        [(stored,) for stored, _ in MALFORMED_EXPENSES],
+    )
+    conn.commit()
+    conn.close()
+    app = start_app(legacy_path, monkeypatch)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_text_dates_become_day_numbers(malformed_app):
+    from datetime import date
+
+    from models import db, Expense, Income
+
+    assert column_types(malformed_app, "expenses")["date"] == "INTEGER"
+    with malformed_app.app_context():
+        raw = db.session.execute(text("SELECT date FROM expenses WHERE note IS NULL ORDER BY id")).scalars().all()
+        assert raw == [date(2024, 1, 31).toordinal(), date(2024, 2, 1).toordinal(), date(2024, 2, 29).toordinal()]
+        assert [e.date for e in Expense.query.filter(Expense.note.is_(None)).order_by(Expense.id)] == [
+            date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29)
+        ]
+        assert Income.query.one().date == date(2024, 1, 15)
+
+        malformed = [e.date for e in Expense.query.filter_by(note="malformed").order_by(Expense.id)]
+        assert malformed == [date.fromisoformat(expected) for _, expected in MALFORMED_EXPENSES]
+
+
+def test_day_number_round_trips(malformed_app):
+    from datetime import date
+
+    from models import db, Expense
+    from money import Money
+
+    with malformed_app.app_context():
+        expense = Expense(user_id=1, amount=Money(1), category="Food", date=date(1999, 12, 31))
+        db.session.add(expense)
+        db.session.commit()
+        db.session.expire_all()
+        assert db.session.get(Expense, expense.id).date == date(1999, 12, 31)
+        assert Expense.query.filter(Expense.date == date(1999, 12, 31)).count() == 1
+
+
+def test_period_filters_match_migrated_dates(malformed_app):
+    from datetime import date
+
+    from models import Expense
+    from services import periods
+
+    with malformed_app.app_context():
+        def dates_in(period):
+            query = periods.apply(Expense.query.filter(Expense.note.is_(None)), Expense.date, period)
+            return sorted(e.date for e in query)
+
+        assert dates_in(periods.month("2024-02")) == [date(2024, 2, 1), date(2024, 2, 29)]
+        assert dates_in(periods.between("2024-01-31", "2024-02-01")) == [date(2024, 1, 31), date(2024, 2, 1)]
+        assert dates_in(periods.year(2024)) == [date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29)]
+        assert dates_in(periods.year(2023)) == []
@@ -0,0 +1,53 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from models import db, Expense
+from money import Money
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2.675", "2.68"),
+    ("2.665", "2.67"),
+    ("-1.005", "-1.01"),
+    (0.125, "0.13"),
+    (0.1 + 0.2, "0.30"),
+    (7, "7.00"),
+])
+def test_rounds_half_up_to_the_cent(value, expected):
+    assert str(Money(value)) == expected
+
+
+@pytest.mark.parametrize("text_value, expected", [
+    (" 12.5 ", Money("12.50")),
+    ("1e2", Money("100")),
+    ("", None),
+    ("abc", None),
+    ("inf", None),
+    ("NaN", None),
+    (None, None),
+])
+def test_parse(text_value, expected):
+    assert Money.parse(text_value) == expected
+
+
+def test_from_cents():
+    assert Money.from_cents(1999) == Money("19.99")
+    assert Money.from_cents(-5) == Money("-0.05")
+    assert Money.from_cents(Decimal("250")) == Money("2.50")
+    assert Money("19.99").cents == 1999
+
+
+def test_money_type_stores_integer_cents(app, user_id):
+    with app.app_context():
+        expense = Expense(user_id=user_id, amount=Money("12.34"), category="Food", date=date(2000, 1, 1))
+        db.session.add(expense)
+        db.session.commit()
+        stored = db.session.execute(text("SELECT amount FROM expenses WHERE id = :id"), {"id": expense.id}).scalar()
+        db.session.expire_all()
+        loaded = db.session.get(Expense, expense.id).amount
+
+    assert stored == 1234
+    assert isinstance(loaded, Money) and loaded == Money("12.34")
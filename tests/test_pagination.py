@@ -0,0 +1,21 @@
+import base64
+import json
+
+import pytest
+
+from services.pagination import decode_cursor
+
+
+def cursor(day, row_id):
+    raw = json.dumps([day, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("row_id", [10 ** 20, 2 ** 63, -2 ** 63 - 1])
+def test_out_of_range_ids_are_rejected(row_id):
+    assert decode_cursor(cursor("2024-01-31", row_id)) is None
+
+
+def test_history_page_ignores_an_overflowing_cursor(client):
+    response = client.get(f"/expenses/expense_history?after={cursor('2024-01-31', 10 ** 20)}")
+    assert response.status_code == 200
@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from services import pdf_reports
+
+
+def test_failed_future_writes_err_file(app):
+    with app.app_context():
+        future = Future()
+        future.add_done_callback(pdf_reports._record_failure(pdf_reports.report_path("1-crashed", ".err")))
+        open(pdf_reports.report_path("1-crashed", ".job"), "w").close()
+        future.set_exception(RuntimeError("process pool died"))
+        assert pdf_reports.report_status("1-crashed") == pdf_reports.FAILED
+
+
+def test_stale_pending_job_is_failed(app):
+    with app.app_context():
+        marker = pdf_reports.report_path("1-fresh", ".job")
+        open(marker, "w").close()
+        assert pdf_reports.report_status("1-fresh") == pdf_reports.PENDING
+
+        stale = time.time() - pdf_reports.REPORT_TIMEOUT - 1
+        os.utime(marker, (stale, stale))
+        assert pdf_reports.report_status("1-fresh") == pdf_reports.FAILED
+
+
+def test_unknown_job_is_failed(app):
+    with app.app_context():
+        assert pdf_reports.report_status("1-unknown") == pdf_reports.FAILED
+
+
+@pytest.fixture
+def process_pool():
+    yield
+    # Shut the pool down here rather than in interpreter teardown, which warns
+    if pdf_reports._executor is not None:
+        pdf_reports._executor.shutdown()
+        pdf_reports._executor = None
+
+
+def test_report_is_built(app, client, user_id, process_pool):
+    response = client.get("/export_pdf")
+    job_url = response.headers["Location"]
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        response = client.get(job_url)
+        if response.status_code != 202:
+            break
+        time.sleep(0.2)
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
@@ -0,0 +1,50 @@
+"""
+Statement counts for the budget-heavy pages are fixed: they do not grow with
+the number of budgets a user has
+"""
+
+import pytest
+
+from conftest import make_user
+
+BUDGET_CATEGORIES = [f"Category {n:02d}" for n in range(1, 19)]
+
+# Statements per page view, whatever the number of budgets
+EXPECTED = {
+    "/dashboard": 2,
+    "/budgets": 2,
+    "/profile": 5,
+    "/get_budget_suggestions": 3,
+}
+
+
+@pytest.fixture
+def budgets_client(app):
+    user_id = make_user(app, budget_categories=BUDGET_CATEGORIES)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return client
+
+
+@pytest.mark.parametrize("path", sorted(EXPECTED))
+def test_statement_count_is_fixed(budgets_client, query_budget, path):
+    # Profile sums income and expenses with the same statement shape
+    response = query_budget(budgets_client, path, max_queries=EXPECTED[path], max_repeats=2)
+    assert response.status_code == 200
+
+
+def test_budgets_page_lists_every_budget(budgets_client):
+    page = budgets_client.get("/budgets").get_data(as_text=True)
+    assert all(category in page for category in BUDGET_CATEGORIES)
+
+
+def test_bulk_save_is_batched(app, budgets_client, query_budget):
+    # Updates the 18 existing budgets and adds two: one lookup, one UPDATE and one INSERT batch, one version bump
+    data = {f"budget_{category}": "50" for category in BUDGET_CATEGORIES + ["Category 19", "Category 20"]}
+    response = query_budget(budgets_client, "/set_budgets_bulk", max_queries=4, max_repeats=1, method="POST", data=data)
+    assert response.status_code == 302
+
+    from models import db, Budget
+    with app.app_context():
+        assert db.session.query(Budget).filter(Budget.budget_limit == 50).count() == 20
@@ -0,0 +1,53 @@
+"""
+The hot read queries must find their rows through an index: no full table
+scans on any of them, and no temp B-tree sorts over raw expense or income
+rows. The small per-month rollup aggregates may still sort their result.
+"""
+
+import pytest
+
+from services.index_advisor import capture_queries, is_flagged, query_plans
+
+PATHS = {
+    "dashboard": ["/dashboard"],
+    "reports": ["/reports"],
+    "budgets": ["/budgets"],
+    "history": [
+        "/expenses/expense_history",
+        "/expenses/expense_history?start_date=2000-01-01&end_date=2100-01-01",
+        "/expenses/expense_history?category=Food",
+        "/expenses/expense_history?category=Food&start_date=2000-01-01&end_date=2100-01-01&total=1",
+        "/income/income_history",
+        "/income/income_history?start_date=2000-01-01&end_date=2100-01-01&total=1",
+    ],
+    "suggestions": ["/get_budget_suggestions"],
+}
+RAW_TABLES = ("expenses", "income")
+
+
+def plans_for(app, user_id, paths):
+    with app.app_context():
+        captured, failures = capture_queries(app, user_id, paths)
+        assert not failures
+        return [(statement, details) for statement, _, details in query_plans(captured)]
+
+
+def touched_tables(details):
+    return {word for detail in details for word in detail.split() if word in RAW_TABLES + ("budgets", "monthly_rollups")}
+
+
+@pytest.mark.parametrize("page", sorted(PATHS))
+def test_queries_search_an_index(app, user_id, page):
+    plans = plans_for(app, user_id, PATHS[page])
+    assert plans
+    for statement, details in plans:
+        assert not [d for d in details if d.startswith("SCAN")], (statement, details)
+        for table in touched_tables(details):
+            assert any(d.startswith(f"SEARCH {table} USING") and "INDEX" in d for d in details), (statement, details)
+
+
+@pytest.mark.parametrize("page", sorted(PATHS))
+def test_raw_rows_are_not_sorted_in_temp_btrees(app, user_id, page):
+    for statement, details in plans_for(app, user_id, PATHS[page]):
+        if touched_tables(details) & set(RAW_TABLES):
+            assert not [d for d in details if is_flagged(d)], (statement, details)
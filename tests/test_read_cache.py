@@ -0,0 +1,100 @@
+"""
+The dashboard is served from the read cache until a write to the user's
+data commits; rolled-back writes leave the cached value in place
+"""
+
+from datetime import date
+
+import pytest
+
+from models import db, Expense
+from money import Money
+from services import cache, rollups, writes
+
+BACKENDS = ["memory", "sqlite", "none"]
+TODAY = date.today().isoformat()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, app, tmp_path):
+    app.config["READ_CACHE_BACKEND"] = request.param
+    app.config["READ_CACHE_PATH"] = str(tmp_path / "read_cache.sqlite")
+    cache.init_app(app)
+    return request.param
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Balances of every dashboard the view actually computed"""
+    import blueprints.main
+    from services.dashboard import load_dashboard
+
+    balances = []
+
+    def counting(user_id, month):
+        data = load_dashboard(user_id, month)
+        balances.append(data.balance)
+        return data
+
+    monkeypatch.setattr(blueprints.main, "load_dashboard", counting)
+    return balances
+
+
+def dashboard(client):
+    assert client.get("/dashboard").status_code == 200
+
+
+def latest_expense_id(app, user_id):
+    with app.app_context():
+        return db.session.scalar(db.select(Expense.id).filter_by(user_id=user_id).order_by(Expense.id.desc()))
+
+
+def test_dashboard_is_served_from_cache(client, backend, computed):
+    dashboard(client)
+    dashboard(client)
+    assert len(computed) == (2 if backend == "none" else 1)
+
+
+@pytest.mark.parametrize("write", ["add", "edit", "delete"])
+def test_committed_writes_refresh_the_dashboard(app, client, user_id, backend, computed, write):
+    dashboard(client)
+    before = computed[-1]
+
+    if write == "add":
+        data = {"amount[]": "40.00", "category[]": "Food", "date[]": TODAY, "note[]": ""}
+        client.post("/expenses/add_expense", data=data)
+        change = -40
+    elif write == "edit":
+        expense_id = latest_expense_id(app, user_id)
+        with app.app_context():
+            old = db.session.get(Expense, expense_id).amount
+        data = {"amount": str(old + 25), "date": TODAY, "category": "Food", "note": ""}
+        client.post(f"/expenses/edit_expense/{expense_id}", data=data)
+        change = -25
+    else:
+        expense_id = latest_expense_id(app, user_id)
+        with app.app_context():
+            old = db.session.get(Expense, expense_id).amount
+        client.get(f"/expenses/delete_expense/{expense_id}")
+        change = old
+
+    dashboard(client)
+    assert computed[-1] == before + change
+
+
+def test_rolled_back_write_keeps_the_cached_dashboard(app, client, user_id, backend, computed):
+    dashboard(client)
+
+    def failing_write():
+        expense = Expense(user_id=user_id, amount=Money(40), category="Food", date=date.today())
+        db.session.add(expense)
+        db.session.flush()
+        rollups.track(expense)  # bumps the user's data version in this transaction
+        raise ValueError("rejected")
+
+    with app.app_context(), pytest.raises(ValueError):
+        writes.run(failing_write)
+
+    dashboard(client)
+    assert len(computed) == (2 if backend == "none" else 1)
+    assert computed[-1] == computed[0]
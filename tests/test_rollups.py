@@ -0,0 +1,106 @@
+"""
+Every write path keeps MonthlyRollup equal to what expected_rollups()
+recomputes from the raw rows, and rebuild-rollups --check notices when it
+does not
+"""
+
+import io
+from datetime import date, timedelta
+
+import pytest
+
+from models import db, Expense, Income, MonthlyRollup
+from services import rollups
+
+TODAY = date.today()
+LAST_YEAR = (TODAY - timedelta(days=400)).isoformat()
+
+
+def drift(app, user_id):
+    with app.app_context():
+        return rollups.find_drift(rollups.expected_rollups(user_id), user_id)
+
+
+def latest(app, model, user_id):
+    with app.app_context():
+        return db.session.scalar(db.select(model.id).filter_by(user_id=user_id).order_by(model.id.desc()))
+
+
+def add_one(client, app, user_id):
+    data = {"amount[]": "12.34", "category[]": "Food", "date[]": TODAY.isoformat(), "note[]": ""}
+    client.post("/expenses/add_expense", data=data)
+
+
+def add_batch(client, app, user_id):
+    data = {
+        "amount[]": ["1.00", "2.50", "3.75"],
+        "category[]": ["Food", "Transport", "Food"],
+        "date[]": [TODAY.isoformat(), LAST_YEAR, LAST_YEAR],
+        "note[]": ["", "", ""],
+    }
+    client.post("/expenses/add_expense", data=data)
+
+
+def edit_category_and_month(client, app, user_id):
+    expense_id = latest(app, Expense, user_id)
+    data = {"amount": "99.99", "date": LAST_YEAR, "category": "Healthcare", "note": "moved"}
+    client.post(f"/expenses/edit_expense/{expense_id}", data=data)
+
+
+def delete(client, app, user_id):
+    client.get(f"/expenses/delete_expense/{latest(app, Expense, user_id)}")
+
+
+def add_income(client, app, user_id):
+    client.post("/income/add_income", data={"amount": "300", "date": LAST_YEAR, "source": "Freelance"})
+
+
+def delete_income(client, app, user_id):
+    client.get(f"/income/delete_income/{latest(app, Income, user_id)}")
+
+
+def import_csv(client, app, user_id):
+    content = f"date,amount,category\n{TODAY},5.00,Food\n{LAST_YEAR},7.25,Other\nbad,1,Food\n".encode()
+    client.post("/expenses/import_csv", data={"file": (io.BytesIO(content), "expenses.csv")},
+                content_type="multipart/form-data")
+
+
+WRITE_PATHS = [add_one, add_batch, edit_category_and_month, delete, add_income, delete_income, import_csv]
+
+
+def stored(app, user_id):
+    with app.app_context():
+        return sorted(db.session.execute(
+            db.select(MonthlyRollup.month, MonthlyRollup.kind, MonthlyRollup.category,
+                      MonthlyRollup.total, MonthlyRollup.count).filter_by(user_id=user_id)
+        ).all())
+
+
+@pytest.mark.parametrize("write", WRITE_PATHS, ids=lambda write: write.__name__)
+def test_write_paths_keep_rollups_exact(app, client, user_id, write):
+    assert drift(app, user_id) == []
+    before = stored(app, user_id)
+
+    write(client, app, user_id)
+
+    assert stored(app, user_id) != before  # the write went through
+    assert drift(app, user_id) == []
+
+
+def test_check_finds_corrupted_rollups(app, user_id):
+    with app.app_context():
+        row = db.session.scalars(db.select(MonthlyRollup).filter_by(user_id=user_id).limit(1)).one()
+        row.count += 3
+        month = row.month
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["rebuild-rollups", "--check"])
+    assert result.exit_code == 1
+    assert f"drift user={user_id} {month}" in result.output
+    assert "1 drifted bucket(s)" in result.output
+
+    result = runner.invoke(args=["rebuild-rollups"])
+    assert result.exit_code == 0
+    assert "fixed 1 drifted bucket(s)" in result.output
+    assert drift(app, user_id) == []
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import make_user
+
+ROOT = __file__.rsplit("/tests/", 1)[0]
+
+
+def test_cookie_backend_does_not_import_flask_session(tmp_path):
+    code = "import sys, app; app.create_app(); print('flask_session' in sys.modules, 'msgspec' in sys.modules)"
+    env = {"DATABASE_URL": f"sqlite:///{tmp_path / 'test.db'}", "SESSION_BACKEND": "cookie", "SECRET_KEY": "x" * 32,
+           "PATH": ""}
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.split() == ["False", "False"]
+
+
+def test_sqlalchemy_backend_keeps_the_login(app):
+    from services import sessions
+    from services.sql_sessions import SqlSessionInterface
+
+    app.config["SESSION_BACKEND"] = "sqlalchemy"
+    sessions.init_app(app)
+    assert isinstance(app.session_interface, SqlSessionInterface)
+
+    user_id = make_user(app)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    assert client.get("/dashboard").status_code == 200
+
+
+@pytest.mark.parametrize("secret_key", [None, "dev-key-change-in-production", "your-secret-key-here-change-in-production"])
+def test_cookie_backend_refuses_a_public_secret_key(tmp_path, monkeypatch, secret_key):
+    from app import create_app
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("SESSION_BACKEND", "cookie")
+    if secret_key is None:
+        monkeypatch.delenv("SECRET_KEY", raising=False)
+    else:
+        monkeypatch.setenv("SECRET_KEY", secret_key)
+    with pytest.raises(RuntimeError, match="SECRET_KEY"):
+        create_app()
+
+
+def test_sessions_stay_server_side_without_a_secret_key(tmp_path, monkeypatch):
+    from app import create_app
+    from services.sql_sessions import SqlSessionInterface
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.delenv("SESSION_BACKEND", raising=False)
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    assert isinstance(create_app().session_interface, SqlSessionInterface)
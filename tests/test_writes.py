@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from services import writes
+
+
+@pytest.fixture
+def coalescing_app(app):
+    app.config.update(WRITE_COALESCING=True, WRITE_TIMEOUT=0.2)
+    writes.init_app(app)
+    return app
+
+
+def test_timeout_has_a_message(coalescing_app):
+    release = threading.Event()
+    with coalescing_app.app_context():
+        with pytest.raises(writes.WriteQueueBusy, match="Write queue busy"):
+            writes.run(release.wait, 5)
+    release.set()
+
+
+def test_jobs_own_timeout_error_is_passed_through(coalescing_app):
+    def job():
+        raise TimeoutError("upstream timed out")
+
+    with coalescing_app.app_context(), pytest.raises(TimeoutError, match="upstream timed out"):
+        writes.run(job)
+
+
+def add_budget(user_id, category, fail=False):
+    from models import db, Budget
+    from money import Money
+
+    db.session.add(Budget(user_id=user_id, category=category, budget_limit=Money(10), month="2000-01"))
+    db.session.flush()
+    if fail:
+        raise ValueError(f"{category} rejected")
+    return category
+
+
+def stored_categories(app, user_id):
+    from models import db, Budget
+
+    with app.app_context():
+        return set(db.session.scalars(db.select(Budget.category).filter_by(user_id=user_id, month="2000-01")))
+
+
+def test_batch_runs_each_job_in_its_own_savepoint(app, user_id):
+    from concurrent.futures import Future
+
+    from services.n_plus_one import count_queries
+
+    batch = [
+        (add_budget, (user_id, "First"), {}, Future()),
+        (add_budget, (user_id, "Second"), {"fail": True}, Future()),
+        (add_budget, (user_id, "Third"), {}, Future()),
+    ]
+    with app.app_context(), count_queries() as statements:
+        writes.WriteQueue(app)._commit(batch)
+
+    first, second, third = (future for *_, future in batch)
+    assert first.result() == "First" and third.result() == "Third"
+    with pytest.raises(ValueError, match="Second rejected"):
+        second.result()
+    assert stored_categories(app, user_id) == {"First", "Third"}
+    assert sum(statement.startswith("SAVEPOINT") for statement in statements) == 3
+    assert sum(statement.startswith("ROLLBACK TO SAVEPOINT") for statement in statements) == 1
+
+
+def test_concurrent_writes_share_one_transaction(app, user_id):
+    from models import db
+
+    app.config.update(WRITE_COALESCING=True, WRITE_MAX_BATCH=3, WRITE_MAX_DELAY_MS=2000)
+    writes.init_app(app)
+    transactions = []
+    results = {}
+
+    def job(category, fail):
+        transactions.append(db.session().get_transaction())
+        return add_budget(user_id, category, fail)
+
+    def caller(category, fail=False):
+        with app.app_context():
+            try:
+                results[category] = writes.run(job, category, fail)
+            except ValueError as e:
+                results[category] = e
+
+    threads = [threading.Thread(target=caller, args=args) for args in [("A",), ("B", True), ("C",)]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(transactions) == 3 and len({id(transaction) for transaction in transactions}) == 1
+    assert results["A"] == "A" and results["C"] == "C"
+    assert isinstance(results["B"], ValueError)
+    assert stored_categories(app, user_id) == {"A", "C"}